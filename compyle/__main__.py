@@ -1,20 +1,62 @@
-from typing import Iterable
+from typing import Iterable, List, Optional
 import argparse
+import functools
+import json
+import os
+import sys
 
-from .frontend import run
-from ._debug import DEBUG_CHANNEL, ENABLED_CHANNELS
+from .frontend import run, run_instructions, parse_source
+from .interpret import eval, eval_incremental, eval_parallel
+from .program import eval_compiled
+from .transpyle import BACKEND, CODE_CACHE
+from ._debug import DEBUG_CHANNEL, ENABLED_CHANNELS, PROFILE, debug_enabled
 
 
-def interactive():
+def interactive(evaluator=eval, sink=None):
     print("I heard you like to eval")
     print("so we put an eval in your eval")
     print("so you can eval while you eval")
     print("                 - AD, 2020 AD")
-    run(iter(input, ""))
+    run(iter(input, ""), evaluator, sink)
 
 
-def noninteractive(inputs: Iterable[str]):
-    run(iter_inputs(inputs))
+def noninteractive(
+    inputs: Iterable[str], evaluator=eval, parse_jobs=None, cache=None, sink=None
+):
+    if debug_enabled(DEBUG_CHANNEL.PARSING):
+        run(iter_inputs(inputs), evaluator, sink)
+    elif cache is not None:
+        run_cached(inputs, evaluator, parse_jobs, cache, sink)
+    elif parse_jobs is None:
+        run_instructions(parse_source(iter_inputs(inputs)), evaluator, sink)
+    else:
+        run_instructions(ingest_inputs(inputs, parse_jobs or None), evaluator, sink)
+
+
+def run_cached(inputs: Iterable[str], evaluator, parse_jobs, cache, sink=None):
+    """Run ``inputs`` using and updating the artifacts of a ``cache``"""
+    from .artifacts import Artifact
+
+    key = cache.key(inputs)
+    artifact = cache.load(key)
+    if artifact is not None:
+        CODE_CACHE.update(artifact.code)
+        run_instructions(artifact.instructions, evaluator, sink)
+        return
+    if parse_jobs is None:
+        instructions = list(parse_source(iter_inputs(inputs)))
+    else:
+        instructions = list(ingest_inputs(inputs, parse_jobs or None))
+    run_instructions(instructions, evaluator, sink)
+    cache.store(key, Artifact(instructions=instructions, code=CODE_CACHE.entries()))
+
+
+def result_sink(output_format: str, **kwargs):
+    """Create the sink for ``output_format`` writing to ``stdout``"""
+    from .sinks import SINKS
+
+    sink_type = SINKS[output_format]
+    return sink_type(sys.stdout.buffer if sink_type.binary else sys.stdout, **kwargs)
 
 
 def iter_inputs(inputs: Iterable[str]):
@@ -26,6 +68,17 @@ def iter_inputs(inputs: Iterable[str]):
             yield from raw_input.splitlines()
 
 
+def ingest_inputs(inputs: Iterable[str], max_workers):
+    """Parse files of ``inputs`` in parallel, and other inputs serially"""
+    from .ingest import parse_file
+
+    for raw_input in inputs:
+        if os.path.isfile(raw_input):
+            yield from parse_file(raw_input, max_workers=max_workers)
+        else:
+            yield from parse_source(raw_input.splitlines())
+
+
 CLI = argparse.ArgumentParser(
     description="The Toy Language Interpreter/Transpyler", prog="compyle",
 )
@@ -34,6 +87,68 @@ CLI.add_argument(
     nargs="*",
     help="Individual statements or paths to files of statements for non-interactive use",
 )
+CLI_MODE = CLI.add_mutually_exclusive_group()
+CLI_MODE.add_argument(
+    "--compile",
+    help="Compile all statements to one program before running it",
+    action="store_true",
+)
+CLI_MODE.add_argument(
+    "--incremental",
+    help="Cache the value of each name until it or its dependencies are reassigned",
+    action="store_true",
+)
+CLI_MODE.add_argument(
+    "--jobs",
+    help="Evaluate expressions in parallel using JOBS processes (0 for all cores)",
+    type=int,
+)
+CLI_MODE.add_argument(
+    "--watch",
+    help="Re-run the program in FILE from its first changed line whenever it changes",
+    metavar="FILE",
+)
+CLI.add_argument(
+    "--parse-jobs",
+    help="Parse INPUT files in parallel using PARSE_JOBS processes (0 for all cores)",
+    type=int,
+)
+CLI.add_argument(
+    "--cache-dir",
+    help="Store parsed and compiled INPUT in DIR and reuse it for the same INPUT",
+    metavar="DIR",
+)
+CLI.add_argument(
+    "--cache-size",
+    help="Evict old artifacts once the cache exceeds SIZE MiB (default: 256)",
+    metavar="SIZE",
+    type=int,
+    default=256,
+)
+CLI.add_argument(
+    "--ast",
+    help="Transpyle expressions to Python syntax trees instead of source code",
+    action="store_true",
+)
+CLI.add_argument(
+    "--vm-size",
+    help="Evaluate expressions of at most SIZE subexpressions with a bytecode VM"
+    f" instead of compiling them (default: {BACKEND.vm_size}, always compile)",
+    metavar="SIZE",
+    type=int,
+    default=BACKEND.vm_size,
+)
+CLI.add_argument(
+    "--format",
+    help="Write results as printed text, JSON Lines, CSV or binary records"
+    " (default: text)",
+    choices=("text", "jsonl", "csv", "binary"),
+)
+CLI.add_argument(
+    "--serve",
+    help="Serve sessions on a Unix socket PATH or [HOST:]PORT instead of reading INPUT",
+    metavar="ADDRESS",
+)
 CLI_DEBUG = CLI.add_argument_group("debug controls")
 CLI_DEBUG.add_argument(
     "--show-parsing", help="Show parsing details", action="store_true",
@@ -46,17 +161,90 @@ CLI_DEBUG.add_argument(
 CLI_DEBUG.add_argument(
     "--show-transpyle", help="Show transpyled source code", action="store_true",
 )
+CLI_DEBUG.add_argument(
+    "--profile",
+    help="Write a JSON report of time spent per phase to stderr",
+    action="store_true",
+)
+CLI_DEBUG.add_argument(
+    "--profile-output", help="Write the profile report to a file instead of stderr",
+)
+
+
+def main(argv: Optional[List[str]] = None):
+    options = CLI.parse_args(argv)
+    for requested, channel in (
+        (options.show_parsing, DEBUG_CHANNEL.PARSING),
+        (options.show_interpret, DEBUG_CHANNEL.INTERPRET),
+        (options.show_transpyle, DEBUG_CHANNEL.TRANSPYLE),
+    ):
+        if requested:
+            ENABLED_CHANNELS.add(channel)
+    if options.ast:
+        BACKEND.tree = True
+    BACKEND.vm_size = options.vm_size
+
+    if options.serve is not None:
+        from concurrent.futures import ProcessPoolExecutor
+        from .server import serve, parse_address
+
+        if (
+            options.compile
+            or options.incremental
+            or options.watch
+            or options.INPUT
+            or options.format
+        ):
+            CLI.error(
+                "--serve cannot be combined with INPUT, --compile, --incremental,"
+                " --watch or --format"
+            )
+        if options.jobs is not None:
+            executor = ProcessPoolExecutor(options.jobs or None)
+            serve(parse_address(options.serve), executor)
+        else:
+            serve(parse_address(options.serve))
+        return
+    if options.watch is not None:
+        from .watch import watch
+
+        if options.INPUT or options.format:
+            CLI.error("--watch cannot be combined with INPUT or --format")
+        watch(options.watch)
+        return
+    if options.compile:
+        evaluator = eval_compiled
+    elif options.incremental:
+        evaluator = eval_incremental
+    elif options.jobs is not None:
+        evaluator = functools.partial(eval_parallel, max_workers=options.jobs or None)
+    else:
+        evaluator = eval
+    if options.profile or options.profile_output:
+        PROFILE.enable()
+    try:
+        if options.INPUT:
+            cache = None
+            if options.cache_dir is not None:
+                from .artifacts import ArtifactCache
+
+                cache_size = options.cache_size * 1024 * 1024
+                cache = ArtifactCache(options.cache_dir, cache_size)
+            sink = result_sink(options.format or "text")
+            noninteractive(options.INPUT, evaluator, options.parse_jobs, cache, sink)
+        elif options.format:
+            # show every result of a session right away
+            interactive(evaluator, result_sink(options.format, batch_size=1))
+        else:
+            interactive(evaluator)
+    finally:
+        if options.profile_output:
+            with open(options.profile_output, "w") as out_stream:
+                json.dump(PROFILE.report(), out_stream, indent=2)
+        elif options.profile:
+            json.dump(PROFILE.report(), sys.stderr, indent=2)
+            print(file=sys.stderr)
 
-options = CLI.parse_args()
-for requested, channel in (
-    (options.show_parsing, DEBUG_CHANNEL.PARSING),
-    (options.show_interpret, DEBUG_CHANNEL.INTERPRET),
-    (options.show_transpyle, DEBUG_CHANNEL.TRANSPYLE),
-):
-    if requested:
-        ENABLED_CHANNELS.add(channel)
 
-if options.INPUT:
-    noninteractive(options.INPUT)
-else:
-    interactive()
+if __name__ == "__main__":
+    main()
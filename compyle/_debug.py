@@ -1,13 +1,18 @@
-from typing import Set
+from typing import Set, Dict, Callable, TypeVar, Any
+from collections import Counter
 
 import sys
 import enum
+import time
+
+R = TypeVar("R")
 
 
 class DEBUG_CHANNEL(enum.Enum):
     INTERPRET = enum.auto()
     PARSING = enum.auto()
     TRANSPYLE = enum.auto()
+    PROFILE = enum.auto()
 
 
 ENABLED_CHANNELS: Set[DEBUG_CHANNEL] = set()
@@ -20,3 +25,76 @@ def debug_print(channel: DEBUG_CHANNEL, *args, **kwargs):
 
 def debug_enabled(channel: DEBUG_CHANNEL):
     return channel in ENABLED_CHANNELS
+
+
+# === Profiling ===
+# The PROFILE channel records where time goes, but must not cost anything
+# when disabled. Instead of checking ENABLED_CHANNELS, hot code paths
+# check the plain ``PROFILE.enabled`` attribute before recording anything.
+#
+# For example, parsing a statement is recorded as
+#
+#     if PROFILE.enabled:
+#         instruction = profile_call("parse", parse_line, line)
+#     else:
+#         instruction = parse_line(line)
+
+
+class Profile:
+    """Wall time and call counts of phases plus statistics of the PROFILE channel"""
+
+    def __init__(self):
+        self.enabled = False
+        #: total wall time of each phase, including all nested phases
+        self.seconds: Dict[str, float] = Counter()
+        self.calls: Dict[str, int] = Counter()
+        #: number, total and maximum of recorded values by name
+        self.statistics: Dict[str, Dict[str, float]] = {}
+
+    def enable(self):
+        self.enabled = True
+        ENABLED_CHANNELS.add(DEBUG_CHANNEL.PROFILE)
+
+    def add_time(self, phase: str, seconds: float):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+
+    def record(self, name: str, value: float):
+        try:
+            statistic = self.statistics[name]
+        except KeyError:
+            self.statistics[name] = {"count": 1, "total": value, "max": value}
+        else:
+            statistic["count"] += 1
+            statistic["total"] += value
+            statistic["max"] = max(statistic["max"], value)
+
+    def report(self) -> Dict[str, Any]:
+        """Summary of all recorded data, suitable for JSON serialisation"""
+        from .transpyle import CODE_CACHE
+
+        return {
+            "phases": {
+                phase: {"calls": self.calls[phase], "seconds": self.seconds[phase]}
+                for phase in self.calls
+            },
+            "code_cache": {
+                "hits": CODE_CACHE.hits,
+                "misses": CODE_CACHE.misses,
+                "size": len(CODE_CACHE),
+                "maxsize": CODE_CACHE.maxsize,
+            },
+            "statistics": self.statistics,
+        }
+
+
+PROFILE = Profile()
+
+
+def profile_call(phase: str, call: Callable[..., R], *args, **kwargs) -> R:
+    """Call ``call(*args, **kwargs)`` and record its wall time as ``phase``"""
+    start = time.perf_counter()
+    try:
+        return call(*args, **kwargs)
+    finally:
+        PROFILE.add_time(phase, time.perf_counter() - start)
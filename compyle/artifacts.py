@@ -0,0 +1,132 @@
+"""
+On-disk cache of parsed and compiled programs
+
+Running the same program again has to parse the same statements and compile
+the same transpylations again. The artifacts of a run - the parsed statements
+and the code objects compiled while evaluating them - are stored in a cache
+directory, and loaded instead of parsing and compiling for later runs.
+
+Artifacts are content-addressed: the key of an artifact is the hash of all
+inputs, the ``compyle`` version and the Python version. Changing any of them
+gives a new key, so stale artifacts are never loaded; they are eventually
+evicted, least recently used first, once the cache exceeds its size limit.
+"""
+from typing import Dict, Iterable, List, Optional, Union
+from types import CodeType
+import hashlib
+import importlib.util
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+
+import attr
+
+from . import __version__
+from .interpret import Assign, Evaluate
+
+#: prefix of every artifact file, to reject foreign or outdated files
+_MAGIC = b"compyle-artifact-1\n"
+_SUFFIX = ".artifact"
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Artifact:
+    """The parsed statements and compiled code of a run"""
+
+    instructions: List[Union[Assign, Evaluate]]
+    #: code objects of transpylations, by their source code
+    code: Dict[str, CodeType]
+
+    def dumps(self) -> bytes:
+        return _MAGIC + pickle.dumps(
+            (self.instructions, marshal.dumps(self.code)),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+    @classmethod
+    def loads(cls, data: bytes) -> "Artifact":
+        if not data.startswith(_MAGIC):
+            raise ValueError("not a compyle artifact")
+        instructions, code = pickle.loads(data[len(_MAGIC) :])
+        return cls(instructions=instructions, code=marshal.loads(code))
+
+
+class ArtifactCache:
+    """Directory of artifacts that is bounded to ``max_size`` bytes"""
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, inputs: Iterable[str]) -> str:
+        """Get the key for ``inputs``, which are paths of files or statements"""
+        digest = hashlib.sha256()
+        for part in (__version__, sys.version, importlib.util.MAGIC_NUMBER.hex()):
+            digest.update(part.encode() + b"\0")
+        for raw_input in inputs:
+            try:
+                with open(raw_input, "rb") as in_stream:
+                    digest.update(b"file\0")
+                    for block in iter(lambda: in_stream.read(1024 * 1024), b""):
+                        digest.update(block)
+            except FileNotFoundError:
+                digest.update(b"text\0" + raw_input.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def load(self, key: str) -> Optional[Artifact]:
+        """Get the artifact for ``key`` if there is a valid one"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as in_stream:
+                artifact = Artifact.loads(in_stream.read())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # artifacts are only a cache - discard anything we cannot read
+            self._remove(path)
+            return None
+        # mark the artifact as recently used for eviction
+        os.utime(path)
+        return artifact
+
+    def store(self, key: str, artifact: Artifact):
+        """Store the ``artifact`` for ``key`` and evict old artifacts if needed"""
+        os.makedirs(self.directory, exist_ok=True)
+        # write to a temporary file first, so that readers never see partial files
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(file_descriptor, "wb") as out_stream:
+                out_stream.write(artifact.dumps())
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used artifacts until the cache fits ``max_size``"""
+        artifacts = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(_SUFFIX):
+                    stat = entry.stat()
+                    artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in artifacts)
+        for _, size, path in sorted(artifacts):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,179 @@
+"""
+Benchmarks of every phase of the ``compyle`` pipeline
+
+Each benchmark runs one phase on a synthetic program from ``generators``:
+
+``parse``
+    parsing of source lines to statements via ``frontend.parse_source``,
+``specialize``
+    specializing the expression of each statement,
+``transpyle``
+    transpyling the expression of each statement,
+``evaluate``
+    evaluating the transpylation of each evaluation statement,
+``interpret``
+    running the entire program via ``interpret.eval``.
+
+Results are measured as the best time of several repetitions, converted to
+throughput in statements per second, and the peak memory allocated while
+running the phase once. Use ``python -m compyle.bench`` to run all benchmarks.
+
+Separately, ``measure_startup`` measures the time of an entire short-lived
+``python -m compyle`` process, which is dominated by importing modules. Use
+``python -m compyle.bench --startup`` to check it against a time budget.
+"""
+from typing import Callable, Dict, List, Iterable, Tuple, Any, Sequence
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import attr
+
+from ..frontend import parse_source
+from ..interpret import eval, Assign, Evaluate, MemoNamespace
+from ..namespace import Namespace
+from .generators import GENERATORS
+
+#: budget in seconds for running ``python -m compyle '>>> 1'``
+STARTUP_BUDGET = 0.5
+
+#: all phases, by name, as functions to prepare the input of the phase
+PHASES: Dict[str, Callable[[List[str]], Callable[[], Any]]] = {}
+
+
+def phase(prepare: Callable[[List[str]], Callable[[], Any]]):
+    """Register a phase under its name, given a function to prepare its input"""
+    PHASES[prepare.__name__] = prepare
+    return prepare
+
+
+@phase
+def parse(lines: List[str]):
+    return lambda: list(parse_source(lines))
+
+
+@phase
+def specialize(lines: List[str]):
+    expressions = [instruction.expression for instruction in parse_source(lines)]
+    return lambda: [expression.specialize({}) for expression in expressions]
+
+
+@phase
+def transpyle(lines: List[str]):
+    expressions = [
+        instruction.expression.specialize({}) for instruction in parse_source(lines)
+    ]
+    return lambda: [expression.transpyle() for expression in expressions]
+
+
+@phase
+def evaluate(lines: List[str]):
+    namespace = Namespace()
+    evaluations = []
+    for instruction in parse_source(lines):
+        expression = instruction.expression.specialize({})
+        if type(instruction) is Assign:
+            namespace = namespace.set(instruction.name, expression)
+        elif type(instruction) is Evaluate:
+            evaluations.append((expression.transpyle(), namespace))
+    # names are resolved as by the interpreter, without recursion
+    return lambda: [
+        transpylation.evaluate(MemoNamespace(namespace))
+        for transpylation, namespace in evaluations
+    ]
+
+
+@phase
+def interpret(lines: List[str]):
+    return lambda: list(eval(parse_source(lines)))
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Result:
+    """Measurement of one phase for one program"""
+
+    program: str
+    phase: str
+    #: number of statements in the program
+    statements: int
+    #: best time in seconds to run the phase
+    seconds: float
+    #: peak memory in bytes allocated while running the phase
+    peak_memory: int
+
+    @property
+    def throughput(self) -> float:
+        """statements processed per second"""
+        return self.statements / self.seconds if self.seconds else float("inf")
+
+
+def measure(program: str, phase: str, size: int = 1000, repeat: int = 3) -> Result:
+    """Measure the ``phase`` for the ``program`` generator of the given ``size``"""
+    lines = GENERATORS[program](size)
+    run = PHASES[phase](lines)
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(
+        program=program,
+        phase=phase,
+        statements=len(lines),
+        seconds=seconds,
+        peak_memory=peak_memory,
+    )
+
+
+def measure_all(
+    programs: Iterable[str] = GENERATORS,
+    phases: Iterable[str] = PHASES,
+    size: int = 1000,
+    repeat: int = 3,
+) -> Iterable[Result]:
+    """Measure all combinations of ``programs`` and ``phases``"""
+    phases = list(phases)
+    for program in programs:
+        for phase_name in phases:
+            yield measure(program, phase_name, size=size, repeat=repeat)
+
+
+def compare(
+    results: Iterable[Result], baseline: Dict[Tuple[str, str], Result]
+) -> Dict[Tuple[str, str], float]:
+    """
+    Get the slowdown of each result relative to its ``baseline`` result
+
+    The slowdown compares the time per statement, so that results remain
+    comparable if the baseline was measured for programs of a different size.
+    """
+    slowdowns = {}
+    for result in results:
+        key = result.program, result.phase
+        if key in baseline:
+            reference = baseline[key]
+            slowdowns[key] = (result.seconds / result.statements) / (
+                reference.seconds / reference.statements
+            )
+    return slowdowns
+
+
+def measure_startup(arguments: Sequence[str] = (">>> 1",), repeat: int = 5) -> float:
+    """Measure the best time in seconds to run ``python -m compyle *arguments``"""
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "compyle", *arguments],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
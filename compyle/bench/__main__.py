@@ -0,0 +1,129 @@
+import argparse
+import json
+import sys
+
+from . import measure_all, measure_startup, compare, Result, PHASES, STARTUP_BUDGET
+from .generators import GENERATORS
+
+CLI = argparse.ArgumentParser(
+    description="Benchmark the phases of the Toy Language Interpreter/Transpyler",
+    prog="compyle.bench",
+)
+CLI.add_argument(
+    "--program",
+    help="Synthetic program to benchmark [default: all]",
+    choices=sorted(GENERATORS),
+    action="append",
+)
+CLI.add_argument(
+    "--phase",
+    help="Phase to benchmark [default: all]",
+    choices=list(PHASES),
+    action="append",
+)
+CLI.add_argument(
+    "--size", help="Number of statements per program", type=int, default=1000
+)
+CLI.add_argument(
+    "--repeat", help="Number of repetitions per measurement", type=int, default=3
+)
+CLI_BASELINE = CLI.add_argument_group("baseline comparison")
+CLI_BASELINE.add_argument(
+    "--save-baseline", help="Store the results as a baseline in a JSON file"
+)
+CLI_BASELINE.add_argument(
+    "--baseline", help="Compare the results against a baseline JSON file"
+)
+CLI_BASELINE.add_argument(
+    "--tolerance",
+    help="Maximum allowed slowdown relative to the baseline [default: %(default)s]",
+    type=float,
+    default=1.25,
+)
+CLI_STARTUP = CLI.add_argument_group("startup time")
+CLI_STARTUP.add_argument(
+    "--startup",
+    help="Benchmark the startup of 'python -m compyle' instead of the phases",
+    action="store_true",
+)
+CLI_STARTUP.add_argument(
+    "--startup-budget",
+    help="Maximum allowed startup time in seconds [default: %(default)s]",
+    type=float,
+    default=STARTUP_BUDGET,
+)
+
+
+def main():
+    options = CLI.parse_args()
+    if options.startup:
+        return startup(options.repeat, options.startup_budget)
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline) as in_stream:
+            baseline = {
+                (record["program"], record["phase"]): Result(**record)
+                for record in json.load(in_stream)
+            }
+    results = []
+    print(
+        f"{'program':<20} {'phase':<12} {'statements/s':>14} {'peak memory':>14}"
+        + (f" {'vs baseline':>12}" if baseline else "")
+    )
+    for result in measure_all(
+        programs=options.program or GENERATORS,
+        phases=options.phase or PHASES,
+        size=options.size,
+        repeat=options.repeat,
+    ):
+        results.append(result)
+        line = (
+            f"{result.program:<20} {result.phase:<12} {result.throughput:>14.1f}"
+            f" {result.peak_memory / 1024:>12.1f}kB"
+        )
+        if baseline:
+            slowdown = compare([result], baseline)
+            line += (
+                f" {slowdown[result.program, result.phase]:>11.2f}x" if slowdown else ""
+            )
+        print(line, flush=True)
+    if options.save_baseline:
+        with open(options.save_baseline, "w") as out_stream:
+            json.dump(
+                [
+                    {
+                        "program": result.program,
+                        "phase": result.phase,
+                        "statements": result.statements,
+                        "seconds": result.seconds,
+                        "peak_memory": result.peak_memory,
+                    }
+                    for result in results
+                ],
+                out_stream,
+                indent=2,
+            )
+    regressions = {
+        key: slowdown
+        for key, slowdown in compare(results, baseline).items()
+        if slowdown > options.tolerance
+    }
+    for (program, phase), slowdown in regressions.items():
+        print(
+            f"regression: {program} {phase} is {slowdown:.2f}x slower than baseline",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+def startup(repeat: int, budget: float):
+    seconds = measure_startup(repeat=repeat)
+    print(f"startup {seconds:.3f}s of budget {budget:.3f}s")
+    if seconds > budget:
+        print(f"regression: startup exceeds budget of {budget:.3f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
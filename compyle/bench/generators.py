@@ -0,0 +1,102 @@
+"""
+Generators of synthetic *Toy Language Programs*
+
+Each generator takes a ``size`` and produces the lines of a program with
+roughly ``size`` statements. Programs are deterministic for the same ``size``
+and valid, i.e. they parse and evaluate without errors.
+"""
+from typing import Callable, Dict, List
+import random
+
+#: all generators, by name
+GENERATORS: Dict[str, Callable[[int], List[str]]] = {}
+
+# chains of references are longer than Python may recurse, so that their
+# evaluation must not be recursive
+_MAX_CHAIN = 2000
+
+
+def generator(function: Callable[[int], List[str]]) -> Callable[[int], List[str]]:
+    """Register a program generator under its name"""
+    GENERATORS[function.__name__] = function
+    return function
+
+
+def identifier(index: int) -> str:
+    """Create a unique identifier for any non-negative ``index``"""
+    letters = []
+    while True:
+        index, digit = divmod(index, 26)
+        letters.append(chr(ord("a") + digit))
+        if not index:
+            return "".join(reversed(letters))
+        index -= 1
+
+
+@generator
+def assignment_chain(size: int) -> List[str]:
+    """Names that each refer to the previous name, evaluated at the chain ends"""
+    lines = []
+    for index in range(size):
+        name = identifier(index)
+        if index % _MAX_CHAIN == 0:
+            lines.append(f"{name} := {index}")
+        else:
+            lines.append(f"{name} := ({identifier(index - 1)} + {index % 7 + 1})")
+        if index % _MAX_CHAIN == _MAX_CHAIN - 1 or index == size - 1:
+            lines.append(f">>> {name}")
+    return lines
+
+
+@generator
+def nested_parentheses(size: int, depth: int = 32) -> List[str]:
+    """Evaluations of deeply nested operators"""
+    rng = random.Random(size)
+    lines = ["x := 3 : 4"]
+    for _ in range(size):
+        expression = "x"
+        for level in range(depth):
+            operand = rng.choice(("x", str(level + 1), f"{level + 1}.5"))
+            if rng.random() < 0.5:
+                expression = f"({expression} {rng.choice('+-*')} {operand})"
+            else:
+                expression = f"({operand} {rng.choice('+-*')} {expression})"
+        lines.append(f">>> {expression[1:-1]}")
+    return lines
+
+
+@generator
+def reference_fan_out(size: int) -> List[str]:
+    """Many names referring to the same few names"""
+    lines = ["base := 3 : 4", "offset := (base * 2)"]
+    for index in range(size // 2):
+        name = identifier(index + 26)
+        lines.append(f"{name} := ((base * {index}) + offset)")
+        lines.append(f">>> ({name} - base) / offset")
+    return lines
+
+
+@generator
+def fraction_arithmetic(size: int) -> List[str]:
+    """Evaluations of arithmetic on fraction and decimal literals"""
+    rng = random.Random(size)
+    lines = []
+    for _ in range(size):
+        terms = [
+            f"{rng.choice((-1, 1)) * rng.randint(1, 99)} : {rng.randint(1, 99)}"
+            for _ in range(3)
+        ]
+        decimal = f"{rng.randint(0, 99)}.{rng.randint(0, 99):02d}"
+        lines.append(f">>> (({terms[0]} / {terms[1]}) * {decimal}) - {terms[2]}")
+    return lines
+
+
+@generator
+def distinct_names(size: int) -> List[str]:
+    """Many distinct names that are each assigned and evaluated once"""
+    lines = []
+    for index in range(size // 2):
+        name = identifier(index)
+        lines.append(f"{name} := {index} : {index % 13 + 1}")
+        lines.append(f">>> {name} * 2")
+    return lines
@@ -0,0 +1,277 @@
+"""
+Evaluation of small expressions by a stack-based bytecode interpreter
+
+Transpyling an expression pays for ``compile`` before the code runs even once;
+for tiny expressions this is far more expensive than the arithmetic itself.
+This backend instead flattens an expression to a postfix sequence of
+instructions - an ``array`` of opcodes and one of their arguments - which a
+small loop executes on a stack of values.
+
+For example, ``(a + 2) * (a + 2)`` with an integer ``a`` is assembled to::
+
+    LOAD_NAME   0  # 'a'
+    LOAD_CONST  0  # 2
+    ADD
+    STORE_TEMP  0
+    LOAD_TEMP   0
+    MULTIPLY
+
+Values and errors are exactly those of the transpyled code: integer literals
+are plain ``int`` constants, divisions use the inferred types of their operands,
+and shared subexpressions are computed only once. Set ``BACKEND.vm_size`` of
+the ``transpyle`` module to the largest number of subexpressions to evaluate
+this way, or pass a ``Backend`` when transpyling a single expression.
+"""
+from typing import Any, Dict, Generic, List, Mapping, Optional, Tuple
+from array import array
+from functools import lru_cache, singledispatch
+
+import attr
+
+from .transpyle import (
+    CompoundExpression,
+    CompylationError,
+    E,
+    Expression,
+    Identifier,
+    T,
+    ValueType,
+    infer_types,
+    post_order,
+    shared_subexpressions,
+)
+from .variables import Reference
+from .numbers import Integer, Fraction, PyRational, divide
+from .operators import OperatorBinary
+from ._debug import PROFILE, profile_call
+
+# === Opcodes ===
+LOAD_CONST = 0
+LOAD_NAME = 1
+LOAD_TEMP = 2
+STORE_TEMP = 3
+ADD = 4
+SUBTRACT = 5
+MULTIPLY = 6
+#: ``/`` of values of which at least one is rational
+TRUE_DIVIDE = 7
+#: ``/`` of two integers, creating a rational
+DIVIDE_INTEGERS = 8
+#: ``/`` of values of unknown types
+DIVIDE = 9
+
+OPNAMES = {
+    value: name
+    for name, value in globals().items()
+    if name.isupper() and type(value) is int
+}
+
+#: opcode of each operator symbol, except for ``/``
+OPERATOR_OPCODES = {"+": ADD, "-": SUBTRACT, "*": MULTIPLY}
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Bytecode(Generic[E, T]):
+    """An expression assembled to instructions of the bytecode interpreter"""
+
+    parent: E
+    #: the opcode of each instruction
+    opcodes: array
+    #: the argument of each instruction, an index for its pool if needed
+    arguments: array
+    #: the values of constants
+    constants: Tuple[Any, ...]
+    #: the identifiers of names
+    names: Tuple[Identifier, ...]
+    #: number of storage slots for shared subexpressions
+    temporaries: int
+
+    @property
+    def source(self) -> str:
+        """the disassembled instructions, one per line"""
+        lines = []
+        for opcode, argument in zip(self.opcodes, self.arguments):
+            line = f"{OPNAMES[opcode]:<11}"
+            if opcode == LOAD_CONST:
+                line += f" {argument}  # {self.constants[argument]!r}"
+            elif opcode == LOAD_NAME:
+                line += f" {argument}  # {self.names[argument]!r}"
+            elif opcode in (LOAD_TEMP, STORE_TEMP):
+                line += f" {argument}"
+            lines.append(line.rstrip())
+        return "\n".join(lines)
+
+    def evaluate(self, namespace: "Mapping[Identifier, Expression]") -> T:
+        if PROFILE.enabled:
+            return profile_call("execute", self._execute, namespace)
+        return self._execute(namespace)
+
+    def _execute(self, namespace: "Mapping[Identifier, Expression]") -> T:
+        constants, names = self.constants, self.names
+        temporaries = [None] * self.temporaries
+        stack: List[Any] = []
+        push, pop = stack.append, stack.pop
+        for opcode, argument in zip(self.opcodes, self.arguments):
+            if opcode == LOAD_CONST:
+                push(constants[argument])
+            elif opcode == LOAD_NAME:
+                push(namespace[names[argument]].evaluate(namespace))
+            elif opcode == LOAD_TEMP:
+                push(temporaries[argument])
+            elif opcode == STORE_TEMP:
+                temporaries[argument] = stack[-1]
+            else:
+                rhs = pop()
+                if opcode == ADD:
+                    stack[-1] = stack[-1] + rhs
+                elif opcode == SUBTRACT:
+                    stack[-1] = stack[-1] - rhs
+                elif opcode == MULTIPLY:
+                    stack[-1] = stack[-1] * rhs
+                elif opcode == TRUE_DIVIDE:
+                    stack[-1] = stack[-1] / rhs
+                elif opcode == DIVIDE_INTEGERS:
+                    stack[-1] = PyRational(stack[-1], rhs)
+                else:
+                    stack[-1] = divide(stack[-1], rhs)
+        return stack[0]
+
+
+@lru_cache(maxsize=1024)
+def assemble(
+    root: CompoundExpression,
+    free_types: Tuple[Tuple[Identifier, ValueType], ...] = (),
+    max_size: Optional[int] = None,
+) -> Optional[Bytecode]:
+    """
+    Assemble ``root`` given the known types of its free names
+
+    If ``root`` has more than ``max_size`` distinct subexpressions, it is not
+    assembled and ``None`` is returned instead.
+    """
+    if max_size is not None and _size_exceeds(root, max_size):
+        return None
+    builder = _Builder(root, infer_types(root, dict(free_types)))
+    return Bytecode(
+        parent=root,
+        opcodes=builder.opcodes,
+        arguments=builder.arguments,
+        constants=tuple(builder.constants),
+        names=tuple(builder.names),
+        temporaries=len(builder.temporaries),
+    )
+
+
+def _size_exceeds(root: Expression, limit: int) -> bool:
+    """Whether ``root`` has more than ``limit`` distinct subexpressions"""
+    # stop counting early, so that large expressions are not traversed
+    for count, _ in enumerate(post_order(root), start=1):
+        if count > limit:
+            return True
+    return False
+
+
+class _Builder:
+    """Flatten an expression to postfix instructions"""
+
+    def __init__(self, root: Expression, types: Dict[Expression, ValueType]):
+        self.types = types
+        self.opcodes = array("B")
+        self.arguments = array("I")
+        self.constants: List[Any] = []
+        self.names: List[Identifier] = []
+        self.temporaries: Dict[Expression, int] = {}
+        self._constant_index: Dict[Tuple[type, Any], int] = {}
+        self._name_index: Dict[Identifier, int] = {}
+        self._shared = shared_subexpressions(root)
+        self._write(root)
+
+    def emit(self, opcode: int, argument: int = 0):
+        self.opcodes.append(opcode)
+        self.arguments.append(argument)
+
+    def constant(self, value: Any) -> int:
+        """The index of ``value`` in the constant pool"""
+        # the type keeps equal values of different types, such as 1 and 1/1, apart
+        key = (type(value), value)
+        try:
+            return self._constant_index[key]
+        except KeyError:
+            self.constants.append(value)
+            index = self._constant_index[key] = len(self.constants) - 1
+            return index
+
+    def name(self, identifier: Identifier) -> int:
+        """The index of ``identifier`` in the name pool"""
+        try:
+            return self._name_index[identifier]
+        except KeyError:
+            self.names.append(identifier)
+            index = self._name_index[identifier] = len(self.names) - 1
+            return index
+
+    def _write(self, root: Expression):
+        # children are written before their parent, which is marked to be
+        # completed once all its children are written
+        stack: List[Tuple[Expression, bool]] = [(root, False)]
+        while stack:
+            expression, complete = stack.pop()
+            if complete:
+                to_bytecode(expression, self)
+                if expression in self._shared:
+                    self.temporaries[expression] = len(self.temporaries)
+                    self.emit(STORE_TEMP, self.temporaries[expression])
+            elif expression in self.temporaries:
+                self.emit(LOAD_TEMP, self.temporaries[expression])
+            else:
+                stack.append((expression, True))
+                stack.extend(
+                    (child, False)
+                    for child in reversed(getattr(expression, "children", ()))
+                )
+
+
+# === Instructions of Expressions ===
+@singledispatch
+def to_bytecode(expression: Expression, builder: _Builder):
+    """
+    Write the instructions computing ``expression`` after those of its children
+
+    This is a ``singledispatch`` function. There is no fallback for expressions
+    without a registered rule.
+    """
+    raise CompylationError(f"no bytecode for {expression!r}")
+
+
+@to_bytecode.register(Integer)
+def integer_bytecode(expression: Integer, builder: _Builder):
+    builder.emit(LOAD_CONST, builder.constant(expression.value))
+
+
+@to_bytecode.register(Fraction)
+def fraction_bytecode(expression: Fraction, builder: _Builder):
+    value = PyRational(expression.numerator, expression.denominator)
+    builder.emit(LOAD_CONST, builder.constant(value))
+
+
+@to_bytecode.register(Reference)
+def reference_bytecode(expression: Reference, builder: _Builder):
+    builder.emit(LOAD_NAME, builder.name(expression.identifier))
+
+
+@to_bytecode.register(OperatorBinary)
+def binary_bytecode(expression: OperatorBinary, builder: _Builder):
+    if expression.symbol == "/":
+        types = [builder.types[child] for child in expression.children]
+        # as for the source code, integers must be divided explicitly
+        if ValueType.RATIONAL in types:
+            builder.emit(TRUE_DIVIDE)
+        elif types == [ValueType.INTEGER, ValueType.INTEGER]:
+            builder.emit(DIVIDE_INTEGERS)
+        else:
+            builder.emit(DIVIDE)
+        return
+    try:
+        builder.emit(OPERATOR_OPCODES[expression.symbol])
+    except KeyError:
+        raise CompylationError(f"no bytecode for operator {expression.symbol!r}")
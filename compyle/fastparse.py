@@ -0,0 +1,143 @@
+"""
+Hand-written parser for the *Toy Language*
+
+This is a recursive descent parser for exactly the same language as the
+``pyparsing`` grammar of the ``parser`` module, producing identical statements
+and expressions. It trades the flexibility and diagnostics of ``pyparsing``
+for speed: it is used to parse all valid statements, while invalid statements
+should be parsed again by the ``pyparsing`` grammar to report what is wrong.
+
+Each rule is a method of ``LineParser`` which takes the position to start
+parsing and returns the parsed object and the position after it.
+"""
+from typing import Tuple, Union
+import re
+
+from .transpyle import Expression
+from .variables import Reference
+from .numbers import Integer, Fraction
+from .operators import OperatorBinary
+from .interpret import Evaluate, Assign
+
+
+class ParseError(BaseException):
+    """A statement does not conform to the *Toy Language*"""
+
+    def __init__(self, line: str, column: int, expected: str):
+        super().__init__(line, column, expected)
+        self.line = line
+        self.column = column
+        self.expected = expected
+
+    def __str__(self):
+        return f"Expected {self.expected} (at char {self.column}) in {self.line!r}"
+
+
+_WHITESPACE = re.compile(r"[ \t]*")
+_IDENTIFIER = re.compile(r"[A-Za-z][A-Za-z_]*")
+_INTEGER = re.compile(r"[-+]?[0-9]+")
+_DECIMAL = re.compile(r"-?\d+\.\d+")
+_OPERATORS = frozenset("+-*/")
+
+
+def parse_line(line: str) -> Union[Assign, Evaluate]:
+    """Parse a single statement"""
+    return LineParser(line).statement()
+
+
+class LineParser:
+    """Parser for the statement in a single ``line``"""
+
+    __slots__ = ("line",)
+
+    def __init__(self, line: str):
+        self.line = line
+
+    def statement(self) -> Union[Assign, Evaluate]:
+        line = self.line
+        position = self.skip(0)
+        if line.startswith(">>>", position):
+            expression, position = self.expression(position + 3)
+            self.end(position)
+            return Evaluate(expression=expression)
+        match = _IDENTIFIER.match(line, position)
+        if match is None:
+            raise ParseError(line, position, "'>>>' or IDENTIFIER")
+        position = self.skip(match.end())
+        if not line.startswith(":=", position):
+            raise ParseError(line, position, "':='")
+        expression, position = self.expression(position + 2)
+        self.end(position)
+        return Assign(name=match.group(), expression=expression)
+
+    def skip(self, position: int) -> int:
+        """Skip any whitespace"""
+        return _WHITESPACE.match(self.line, position).end()
+
+    def end(self, position: int):
+        """Ensure there is nothing but a comment left"""
+        position = self.skip(position)
+        if position < len(self.line) and self.line[position] != "#":
+            raise ParseError(self.line, position, "end of line")
+
+    def expression(self, position: int) -> Tuple[Expression, int]:
+        """A top-level expression, which may omit parentheses of a binary operator"""
+        lhs, position = self.nested(position)
+        operator_position = self.skip(position)
+        if (
+            operator_position < len(self.line)
+            and self.line[operator_position] in _OPERATORS
+        ):
+            return self.binary_operator(lhs, operator_position)
+        return lhs, position
+
+    def nested(self, position: int) -> Tuple[Expression, int]:
+        """A parenthesized binary operator or a primitive"""
+        position = self.skip(position)
+        if not self.line.startswith("(", position):
+            return self.primitive(position)
+        lhs, position = self.nested(position + 1)
+        expression, position = self.binary_operator(lhs, self.skip(position))
+        position = self.skip(position)
+        if not self.line.startswith(")", position):
+            raise ParseError(self.line, position, "')'")
+        return expression, position + 1
+
+    def binary_operator(
+        self, lhs: Expression, position: int
+    ) -> Tuple[OperatorBinary, int]:
+        """The operator and right hand side of a binary operator"""
+        if position >= len(self.line) or self.line[position] not in _OPERATORS:
+            raise ParseError(self.line, position, "one of '+', '-', '*', '/'")
+        rhs, end = self.nested(position + 1)
+        return OperatorBinary(symbol=self.line[position], children=(lhs, rhs)), end
+
+    def primitive(self, position: int) -> Tuple[Expression, int]:
+        """A reference or a fraction, decimal or integer literal"""
+        line = self.line
+        match = _IDENTIFIER.match(line, position)
+        if match is not None:
+            return Reference(match.group()), match.end()
+        integer = _INTEGER.match(line, position)
+        if integer is not None:
+            colon = self.skip(integer.end())
+            if line.startswith(":", colon):
+                denominator = _INTEGER.match(line, self.skip(colon + 1))
+                if denominator is None:
+                    raise ParseError(line, self.skip(colon + 1), "INTEGER")
+                return (
+                    Fraction(
+                        numerator=int(integer.group()),
+                        denominator=int(denominator.group()),
+                    ),
+                    denominator.end(),
+                )
+        decimal = _DECIMAL.match(line, position)
+        if decimal is not None:
+            literal = decimal.group()
+            numerator = int(literal.replace(".", ""))
+            denominator = 10 ** (len(literal) - literal.index(".") - 1)
+            return Fraction(numerator=numerator, denominator=denominator), decimal.end()
+        if integer is not None:
+            return Integer(value=int(integer.group())), integer.end()
+        raise ParseError(line, position, "IDENTIFIER, FRACTION, DECIMAL or INTEGER")
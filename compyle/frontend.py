@@ -1,44 +1,51 @@
-from typing import Iterable
+from typing import Iterable, Callable, Iterator, Any, Union, Optional, TYPE_CHECKING
+from collections import deque
 import sys
 
-import pyparsing as pp
+from .interpret import eval, Assign, Evaluate
+from .parser import grammar
+from .fastparse import parse_line, ParseError
+from ._debug import debug_enabled, DEBUG_CHANNEL, PROFILE, profile_call
 
-from .interpret import eval
-from .parser import TOP_LEVEL
-from ._debug import debug_enabled, DEBUG_CHANNEL
+if TYPE_CHECKING:
+    import pyparsing as pp
+
+    from .sinks import ResultSink
 
 
 # Debugging for PyParsing
+# Diagnostics are written to stderr, so that they never mix with results.
 def show_parse_location(instring, start, end=None):
-    print("    " + instring)
+    print("    " + instring, file=sys.stderr)
     if end is not None and end != start:
-        print("   " + (" " * start) + "^" + ("-" * (end - start)) + "^")
+        print(
+            "   " + (" " * start) + "^" + ("-" * (end - start)) + "^", file=sys.stderr
+        )
     else:
-        print("   " + (" " * start) + "^")
+        print("   " + (" " * start) + "^", file=sys.stderr)
 
 
 def on_start_parse(instring, loc, expr):
-    print("! Search:", expr)
+    print("! Search:", expr, file=sys.stderr)
     show_parse_location(instring, loc + 1)
 
 
 def on_find_parse(instring, startloc, endloc, expr, toks):
     from .parser import unparse
 
-    print("! +Found:", expr, " -> ", repr(unparse(toks[0])))
+    print("! +Found:", expr, " -> ", repr(unparse(toks[0])), file=sys.stderr)
     show_parse_location(instring, startloc, endloc)
 
 
-def on_fail_parse(instring, loc, expr, exc: pp.ParseBaseException):
-    print("! Reject:", expr, "(", exc, ")")
+def on_fail_parse(instring, loc, expr, exc: "pp.ParseBaseException"):
+    print("! Reject:", expr, "(", exc, ")", file=sys.stderr)
     show_parse_location(instring, exc.column)
 
 
 def set_parser_debug(on_success=False):
     """Activate PyParsing debugging for most expressions"""
-    from .parser import PRIMITIVES, NESTED, binary_operator
-
-    for expression in (PRIMITIVES, NESTED, binary_operator):
+    rules = grammar()
+    for expression in (rules.PRIMITIVES, rules.NESTED, rules.binary_operator):
         expression.setDebugActions(
             on_start_parse if on_success else lambda *args: True,
             on_find_parse if on_success else lambda *args: True,
@@ -47,20 +54,77 @@ def set_parser_debug(on_success=False):
 
 
 def parse_source(source: Iterable[str]):
+    # The pyparsing grammar provides debug output and error diagnostics.
+    # Only use it if requested or for statements the fast parser rejects.
+    if debug_enabled(DEBUG_CHANNEL.PARSING):
+        yield from map(parse_diagnostic, filter(None, map(str.strip, source)))
+        return
     for line in map(str.strip, source):
         if not line:
             continue
         try:
-            instruction = TOP_LEVEL.parseString(line, parseAll=True)[0]
-        except pp.ParseBaseException as exc:
-            on_fail_parse(line, None, None, exc)
-            sys.exit(1)
-        else:
-            yield instruction
-
-
-def run(source: Iterable[str]):
+            if PROFILE.enabled:
+                instruction = profile_call("parse", parse_line, line)
+            else:
+                instruction = parse_line(line)
+        except ParseError:
+            instruction = parse_diagnostic(line)
+        yield instruction
+
+
+def parse_diagnostic(line: str, location: Optional[str] = None):
+    """Parse a single statement with the pyparsing grammar, exiting on failure"""
+    import pyparsing as pp
+
+    try:
+        return grammar().TOP_LEVEL.parseString(line, parseAll=True)[0]
+    except pp.ParseBaseException as exc:
+        if location is not None:
+            print("! In:", location, file=sys.stderr)
+        on_fail_parse(line, None, None, exc)
+        sys.exit(1)
+
+
+def parse_statement(line: str) -> Union[Assign, Evaluate]:
+    """Parse a single statement, raising ``pyparsing.ParseBaseException`` on failure"""
+    try:
+        return parse_line(line)
+    except ParseError:
+        return grammar().TOP_LEVEL.parseString(line, parseAll=True)[0]
+
+
+def run(
+    source: Iterable[str],
+    evaluator: Callable[[Iterable[Union[Assign, Evaluate]]], Iterator[Any]] = eval,
+    sink: "Optional[ResultSink]" = None,
+):
     if debug_enabled(DEBUG_CHANNEL.PARSING):
         set_parser_debug(on_success=True)
-    for result in eval(parse_source(source)):
-        print(result)
+    run_instructions(parse_source(source), evaluator, sink)
+
+
+def run_instructions(
+    instructions: Iterable[Union[Assign, Evaluate]],
+    evaluator: Callable[[Iterable[Union[Assign, Evaluate]]], Iterator[Any]] = eval,
+    sink: "Optional[ResultSink]" = None,
+):
+    """Evaluate ``instructions``, printing each result or writing it to ``sink``"""
+    if sink is None:
+        for result in evaluator(instructions):
+            print(result)
+        return
+    # evaluators may read ahead, so remember the index of every evaluation
+    # to match it with its result later on
+    indices = deque()
+
+    def track_evaluations():
+        for index, instruction in enumerate(instructions):
+            if type(instruction) is Evaluate:
+                indices.append(index)
+            yield instruction
+
+    try:
+        for result in evaluator(track_evaluations()):
+            sink.write(indices.popleft(), result)
+    finally:
+        sink.flush()
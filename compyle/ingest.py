@@ -0,0 +1,99 @@
+"""
+Parallel parsing of large program files
+
+Statements of the *Toy Language* are one per line and parse independently.
+Program files are memory-mapped and split into chunks at line boundaries;
+each chunk is parsed by a worker process using the fast parser, and the
+statements of all chunks are provided in order.
+
+Workers do not report invalid statements themselves. Instead, they mark the
+position of each line the fast parser rejects, and the main process parses it
+again with the ``pyparsing`` grammar for diagnostics, showing its line number.
+"""
+from typing import Iterator, List, Optional, Tuple, Union
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+import mmap
+import os
+
+from .fastparse import parse_line, ParseError
+from .frontend import parse_diagnostic
+from .interpret import Assign, Evaluate
+
+#: default size of chunks in bytes
+CHUNKSIZE = 4 * 1024 * 1024
+
+
+def parse_file(
+    path: str,
+    executor: Optional[Executor] = None,
+    chunksize: int = CHUNKSIZE,
+    max_workers: Optional[int] = None,
+) -> Iterator[Union[Assign, Evaluate]]:
+    """
+    Parse the statements of a program file in parallel
+
+    The file is split into chunks of at least ``chunksize`` bytes which are
+    parsed by the ``executor``. If no ``executor`` is given, a
+    ``ProcessPoolExecutor`` with ``max_workers`` is used.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            yield from parse_file(path, executor, chunksize, max_workers)
+        return
+    # bound the number of in-flight chunks so that results are not kept forever
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    pending = deque()
+    line_number = 1
+    for start, end in chunk_boundaries(path, chunksize):
+        pending.append(executor.submit(_parse_chunk, path, start, end))
+        while pending and (pending[0].done() or len(pending) > max_pending):
+            line_number = yield from _resolve(path, line_number, pending.popleft())
+    while pending:
+        line_number = yield from _resolve(path, line_number, pending.popleft())
+
+
+def chunk_boundaries(path: str, chunksize: int) -> List[Tuple[int, int]]:
+    """Split the file at ``path`` into ``(start, end)`` offsets at line boundaries"""
+    with open(path, "rb") as in_stream:
+        size = os.fstat(in_stream.fileno()).st_size
+        if not size:
+            return []
+        with mmap.mmap(in_stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            boundaries, start = [], 0
+            while start < size:
+                newline = data.find(b"\n", min(start + chunksize, size) - 1)
+                end = size if newline == -1 else newline + 1
+                boundaries.append((start, end))
+                start = end
+            return boundaries
+
+
+def _parse_chunk(
+    path: str, start: int, end: int
+) -> Tuple[List[Union[Assign, Evaluate, Tuple[int, str]]], int]:
+    """Parse a chunk, marking rejected lines by their index and text"""
+    with open(path, "rb") as in_stream:
+        with mmap.mmap(in_stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode()
+    statements = []
+    for index, line in enumerate(text.split("\n")):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            statements.append(parse_line(line))
+        except ParseError:
+            statements.append((index, line))
+    return statements, text.count("\n")
+
+
+def _resolve(path: str, line_number: int, future) -> Iterator[Union[Assign, Evaluate]]:
+    """Provide the statements of a chunk starting at ``line_number``"""
+    statements, lines = future.result()
+    for statement in statements:
+        if type(statement) is tuple:
+            index, line = statement
+            statement = parse_diagnostic(line, f"{path}:{line_number + index}")
+        yield statement
+    return line_number + lines
@@ -1,9 +1,34 @@
-from typing import Mapping, Iterable, Union
+from typing import (
+    Container,
+    Iterable,
+    Iterator,
+    Union,
+    Mapping,
+    Dict,
+    Set,
+    List,
+    Tuple,
+    Optional,
+    TYPE_CHECKING,
+)
+from collections import defaultdict, deque
+import os
 
 import attr
 
-from .transpyle import EvaluationError, Expression, Identifier
-from ._debug import debug_print, DEBUG_CHANNEL
+from .namespace import Namespace
+from .transpyle import (
+    CompoundExpression,
+    EvaluationError,
+    Expression,
+    Identifier,
+    reference_types,
+)
+from .variables import value_expression
+from ._debug import debug_print, debug_enabled, DEBUG_CHANNEL, PROFILE, profile_call
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
 
 
 @attr.s(frozen=True, auto_attribs=True)
@@ -19,40 +44,283 @@ class Assign:
 
 def eval(instructions: Iterable[Union[Assign, Evaluate]]):
     """Evaluate a series of instructions"""
-    namespace: Mapping[Identifier, Expression] = {}
+    namespace: Namespace[Identifier, Expression] = Namespace()
+    for instruction in instructions:
+        if type(instruction) is Assign:
+            namespace = eval_assign(instruction, namespace)
+        elif type(instruction) is Evaluate:
+            yield eval_evaluate(instruction, namespace)
+        else:
+            raise EvaluationError(f"Unknown instruction: {instruction}")
+
+
+def eval_parallel(
+    instructions: Iterable[Union[Assign, Evaluate]],
+    executor: "Optional[Executor]" = None,
+    chunksize: int = 64,
+    max_workers: Optional[int] = None,
+):
+    """
+    Evaluate a series of instructions, evaluating chunks of evaluations in parallel
+
+    Evaluations only depend on the namespace snapshot at their position. Each
+    evaluation is shipped with its snapshot to the ``executor`` in chunks of
+    ``chunksize``; results are still provided in order. If no ``executor`` is
+    given, a ``ProcessPoolExecutor`` with ``max_workers`` is used.
+    """
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            yield from eval_parallel(
+                instructions, executor, chunksize, max_workers=max_workers
+            )
+        return
+    # bound the number of in-flight chunks so that results are not kept forever
+    max_pending = 4 * (max_workers or os.cpu_count() or 1)
+    namespace: Namespace[Identifier, Expression] = Namespace()
+    chunk: List[Tuple[Evaluate, Namespace[Identifier, Expression]]] = []
+    pending = deque()
     for instruction in instructions:
         if type(instruction) is Assign:
             namespace = eval_assign(instruction, namespace)
+        elif type(instruction) is Evaluate:
+            chunk.append((instruction, namespace))
+            if len(chunk) >= chunksize:
+                pending.append(executor.submit(_eval_chunk, chunk))
+                chunk = []
+            while pending and (pending[0].done() or len(pending) > max_pending):
+                yield from pending.popleft().result()
+        else:
+            raise EvaluationError(f"Unknown instruction: {instruction}")
+    if chunk:
+        pending.append(executor.submit(_eval_chunk, chunk))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _eval_chunk(
+    chunk: List[Tuple[Evaluate, Namespace[Identifier, Expression]]]
+) -> list:
+    return [eval_evaluate(instruction, namespace) for instruction, namespace in chunk]
+
+
+def eval_incremental(instructions: Iterable[Union[Assign, Evaluate]]):
+    """Evaluate a series of instructions, reusing values of unchanged names"""
+    namespace = IncrementalNamespace()
+    for instruction in instructions:
+        if type(instruction) is Assign:
+            namespace.assign(instruction.name, simplify(instruction))
         elif type(instruction) is Evaluate:
             yield eval_evaluate(instruction, namespace)
         else:
             raise EvaluationError(f"Unknown instruction: {instruction}")
 
 
+class Failure(str):
+    """The error message of an evaluation, provided instead of its value"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({str.__repr__(self)})"
+
+
+class CyclicReference(EvaluationError):
+    """The value of a name depends on the value of the name itself"""
+
+    def __init__(self, name: Identifier):
+        super().__init__(name)
+        self.name = name
+
+
+def resolve(
+    namespace: Mapping[Identifier, Expression],
+    name: Identifier,
+    expressions: Mapping[Identifier, Expression],
+    values: Dict[Identifier, Expression],
+) -> Expression:
+    """
+    Evaluate the expression of ``name`` in ``expressions`` to a value expression
+
+    The names that ``name`` depends on are evaluated first and stored in
+    ``values``, so evaluating an expression only looks up known values even
+    for long chains of names.
+    """
+    for current in resolution_order(name, expressions, values):
+        values[current] = value_expression(expressions[current].evaluate(namespace))
+    return values[name]
+
+
+def resolution_order(
+    name: Identifier,
+    expressions: Mapping[Identifier, Expression],
+    known: Container[Identifier],
+) -> Iterator[Identifier]:
+    """
+    Iterate over ``name`` and the names it depends on, dependencies first
+
+    Names that are ``known`` are skipped, which includes names added to it
+    while iterating. The names are searched using an explicit stack instead of
+    recursion. If the value of a name depends on the name itself,
+    ``CyclicReference`` is raised.
+    """
+    # names are provided once all their dependencies are provided
+    stack: List[Tuple[Identifier, bool]] = [(name, False)]
+    resolving: Set[Identifier] = set()
+    while stack:
+        current, expanded = stack.pop()
+        if expanded:
+            resolving.discard(current)
+            yield current
+        elif current in resolving:
+            raise CyclicReference(current)
+        elif current not in known:
+            resolving.add(current)
+            stack.append((current, True))
+            # undefined names are left to the evaluation to report
+            stack.extend(
+                (dependency, False)
+                for dependency in expressions[current].names.free
+                if dependency in expressions
+            )
+
+
+class MemoNamespace(Mapping[Identifier, Expression]):
+    """
+    View on a namespace that evaluates each name at most once
+
+    Looking up a name provides the value expression of its assigned expression.
+    Since the view is meant for a single evaluation, values are never invalidated.
+    """
+
+    def __init__(self, namespace: Mapping[Identifier, Expression]):
+        self._namespace = namespace
+        self._values: Dict[Identifier, Expression] = {}
+
+    def __getitem__(self, name: Identifier) -> Expression:
+        try:
+            return self._values[name]
+        except KeyError:
+            return resolve(self, name, self._namespace, self._values)
+
+    def __contains__(self, name) -> bool:
+        return name in self._namespace
+
+    def __iter__(self) -> Iterator[Identifier]:
+        return iter(self._namespace)
+
+    def __len__(self) -> int:
+        return len(self._namespace)
+
+
+class IncrementalNamespace(Mapping[Identifier, Expression]):
+    """
+    Namespace that caches the value of each name until it is invalidated
+
+    Looking up a name provides the value expression of its assigned expression.
+    The value is cached until the name or any name it depends on, directly or
+    transitively, is assigned again.
+    """
+
+    def __init__(self):
+        self._expressions: Dict[Identifier, Expression] = {}
+        self._values: Dict[Identifier, Expression] = {}
+        #: names whose expression directly refers to a given name
+        self._dependents: Dict[Identifier, Set[Identifier]] = defaultdict(set)
+
+    def assign(self, name: Identifier, expression: Expression):
+        """Assign ``expression`` to ``name``, invalidating all its dependents"""
+        try:
+            previous = self._expressions[name]
+        except KeyError:
+            pass
+        else:
+            for dependency in previous.names.free:
+                self._dependents[dependency].discard(name)
+        self._expressions[name] = expression
+        for dependency in expression.names.free:
+            self._dependents[dependency].add(name)
+        self._invalidate(name)
+
+    def _invalidate(self, name: Identifier):
+        # Any cached value implies that its dependencies are cached as well.
+        # We can stop at names that are not cached, since none of their
+        # dependents may be cached.
+        self._values.pop(name, None)
+        stack = list(self._dependents.get(name, ()))
+        while stack:
+            name = stack.pop()
+            if self._values.pop(name, None) is not None:
+                stack.extend(self._dependents.get(name, ()))
+
+    def __getitem__(self, name: Identifier) -> Expression:
+        try:
+            return self._values[name]
+        except KeyError:
+            return resolve(self, name, self._expressions, self._values)
+
+    def __iter__(self) -> Iterator[Identifier]:
+        return iter(self._expressions)
+
+    def __len__(self) -> int:
+        return len(self._expressions)
+
+
 def simplify(instruction: Union[Assign, Evaluate]):
-    from .parser import unparse
-
-    expression = instruction.expression.specialize({})
-    if expression is not instruction.expression:
-        new_source = repr(unparse(expression))
-        debug_print(
-            DEBUG_CHANNEL.INTERPRET, repr(unparse(instruction)), "=>", new_source
-        )
+    if PROFILE.enabled:
+        PROFILE.record("expression_nodes", count_nodes(instruction.expression))
+        expression = profile_call("specialize", instruction.expression.specialize, {})
     else:
-        debug_print(DEBUG_CHANNEL.INTERPRET, repr(unparse(instruction)))
-    debug_print(DEBUG_CHANNEL.TRANSPYLE, expression.transpyle().source)
+        expression = instruction.expression.specialize({})
+    if debug_enabled(DEBUG_CHANNEL.INTERPRET):
+        from .parser import unparse
+
+        if expression is not instruction.expression:
+            new_source = repr(unparse(expression))
+            debug_print(
+                DEBUG_CHANNEL.INTERPRET, repr(unparse(instruction)), "=>", new_source
+            )
+        else:
+            debug_print(DEBUG_CHANNEL.INTERPRET, repr(unparse(instruction)))
+    if debug_enabled(DEBUG_CHANNEL.TRANSPYLE):
+        debug_print(DEBUG_CHANNEL.TRANSPYLE, expression.transpyle().source)
     return expression
 
 
-def eval_assign(instruction: Assign, namespace: Mapping[Identifier, Expression]):
+def count_nodes(expression: Expression) -> int:
+    """Count the expressions in the tree of ``expression``"""
+    count, stack = 0, [expression]
+    while stack:
+        count += 1
+        stack.extend(getattr(stack.pop(), "children", ()))
+    return count
+
+
+def eval_assign(instruction: Assign, namespace: Namespace[Identifier, Expression]):
     expression = simplify(instruction)
-    return {**namespace, instruction.name: expression}
+    return namespace.set(instruction.name, expression)
 
 
 def eval_evaluate(instruction: Evaluate, namespace: Mapping[Identifier, Expression]):
     expression = simplify(instruction)
+    if PROFILE.enabled:
+        PROFILE.record("namespace_size", len(namespace))
+    if type(namespace) is not IncrementalNamespace:
+        namespace = MemoNamespace(namespace)
     try:
+        if isinstance(expression, CompoundExpression):
+            # names are looked up in the memoizing namespace, so inferring
+            # their types evaluates them only once as well
+            types = reference_types(expression, namespace)
+            if PROFILE.enabled:
+                transpylation = profile_call("transpyle", expression.transpyle, types)
+            else:
+                transpylation = expression.transpyle(types)
+            return transpylation.evaluate(namespace)
         return expression.evaluate(namespace=namespace)
     except KeyError as e:
         (key,) = e.args
-        return f"NameError: name {key!r} is not defined"
+        return Failure(f"NameError: name {key!r} is not defined")
+    except CyclicReference as err:
+        return Failure(f"RecursionError: name {err.name!r} refers to itself")
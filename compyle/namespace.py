@@ -0,0 +1,178 @@
+"""
+Persistent mapping used for interpreter namespaces
+
+Every statement of a program sees a snapshot of the namespace at its
+position; assignments create a new snapshot instead of modifying the old one.
+Copying a ``dict`` for every assignment makes this quadratic, so snapshots are
+instead represented as a Hash Array Mapped Trie: each assignment copies only
+the path from the root to the changed entry, and all other nodes are shared
+between the old and new snapshot.
+
+The trie consumes the hash of each key in chunks of ``_BITS`` bits per level.
+Each ``_Node`` only stores its occupied slots, with a ``bitmap`` marking which
+of the ``2 ** _BITS`` possible slots are in use. Slots are either entries of
+``(hash, key, value)`` or sub-nodes; keys whose entire hash is equal are kept
+in a ``_Collision`` node.
+"""
+
+from typing import Iterable, Iterator, Mapping, Tuple, TypeVar, Union
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+Entry = Tuple[int, K, V]
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+class _Node:
+    """Bitmap-compressed inner node of the trie"""
+
+    __slots__ = ("bitmap", "slots")
+
+    def __init__(self, bitmap: int, slots: tuple):
+        self.bitmap = bitmap
+        self.slots = slots
+
+
+class _Collision:
+    """Node of entries whose keys have the exact same hash"""
+
+    __slots__ = ("hash", "slots")
+
+    def __init__(self, key_hash: int, slots: tuple):
+        self.hash = key_hash
+        self.slots = slots
+
+
+_EMPTY = _Node(0, ())
+
+
+def _item_hash(item: "Union[Entry, _Collision]") -> int:
+    return item.hash if type(item) is _Collision else item[0]
+
+
+def _merge(first, second, shift: int) -> "Union[_Node, _Collision]":
+    """Create the node holding two entries/collisions with distinct keys"""
+    first_hash, second_hash = _item_hash(first), _item_hash(second)
+    if first_hash == second_hash:
+        # only plain entries may share a hash; collisions absorb all equal hashes
+        return _Collision(first_hash, (first, second))
+    first_index = (first_hash >> shift) & _MASK
+    second_index = (second_hash >> shift) & _MASK
+    if first_index == second_index:
+        return _Node(1 << first_index, (_merge(first, second, shift + _BITS),))
+    if first_index > second_index:
+        first, second = second, first
+        first_index, second_index = second_index, first_index
+    return _Node((1 << first_index) | (1 << second_index), (first, second))
+
+
+def _lookup(node, key_hash: int, key, shift: int = 0):
+    while True:
+        if type(node) is _Collision:
+            if node.hash == key_hash:
+                for _, slot_key, slot_value in node.slots:
+                    if slot_key is key or slot_key == key:
+                        return slot_value
+            raise KeyError(key)
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not node.bitmap & bit:
+            raise KeyError(key)
+        slot = node.slots[_popcount(node.bitmap & (bit - 1))]
+        if type(slot) is tuple:
+            if slot[1] is key or (slot[0] == key_hash and slot[1] == key):
+                return slot[2]
+            raise KeyError(key)
+        node = slot
+        shift += _BITS
+
+
+def _assoc(node, entry: Entry, shift: int = 0) -> "Tuple[object, bool]":
+    """Create a new ``node`` with ``entry`` set and whether it was added"""
+    key_hash, key, _ = entry
+    if type(node) is _Collision:
+        if node.hash != key_hash:
+            return _merge(node, entry, shift), True
+        for index, (_, slot_key, _) in enumerate(node.slots):
+            if slot_key is key or slot_key == key:
+                slots = node.slots[:index] + (entry,) + node.slots[index + 1 :]
+                return _Collision(key_hash, slots), False
+        return _Collision(key_hash, node.slots + (entry,)), True
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    index = _popcount(node.bitmap & (bit - 1))
+    if not node.bitmap & bit:
+        slots = node.slots[:index] + (entry,) + node.slots[index:]
+        return _Node(node.bitmap | bit, slots), True
+    slot = node.slots[index]
+    if type(slot) is tuple:
+        if slot[1] is key or (slot[0] == key_hash and slot[1] == key):
+            replacement, added = entry, False
+        else:
+            replacement, added = _merge(slot, entry, shift + _BITS), True
+    else:
+        replacement, added = _assoc(slot, entry, shift + _BITS)
+    slots = node.slots[:index] + (replacement,) + node.slots[index + 1 :]
+    return _Node(node.bitmap, slots), added
+
+
+def _iter_entries(node) -> "Iterator[Entry]":
+    stack = [node]
+    while stack:
+        for slot in stack.pop().slots:
+            if type(slot) is tuple:
+                yield slot
+            else:
+                stack.append(slot)
+
+
+class Namespace(Mapping[K, V]):
+    """
+    Immutable mapping with cheap modified copies
+
+    Use ``namespace.set(key, value)`` to get a new ``Namespace`` which includes
+    the new ``key``/``value`` pair. The original ``namespace`` is not modified,
+    and both share the bulk of their content.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: "Union[Mapping[K, V], Iterable[Tuple[K, V]]]" = ()):
+        self._root, self._size = _EMPTY, 0
+        if isinstance(items, Mapping):
+            items = items.items()
+        for key, value in items:
+            self._root, added = _assoc(self._root, (hash(key) & _HASH_MASK, key, value))
+            self._size += added
+
+    def set(self, key: K, value: V) -> "Namespace[K, V]":
+        """Create a new ``Namespace`` with ``key`` mapped to ``value``"""
+        root, added = _assoc(self._root, (hash(key) & _HASH_MASK, key, value))
+        result = type(self).__new__(type(self))
+        result._root, result._size = root, self._size + added
+        return result
+
+    def __getitem__(self, key: K) -> V:
+        return _lookup(self._root, hash(key) & _HASH_MASK, key)
+
+    def __contains__(self, key) -> bool:
+        try:
+            _lookup(self._root, hash(key) & _HASH_MASK, key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[K]:
+        return (key for _, key, _ in _iter_entries(self._root))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
@@ -1,29 +1,400 @@
-from typing import Mapping, Any
+from typing import Mapping, Any, Optional, Tuple
 from fractions import Fraction as PyFraction
+from math import gcd
+import numbers
+import operator
+import sys
 
 import attr
 
-from .transpyle import Expression, Names, Transpylation, Identifier
+from .transpyle import (
+    Expression,
+    Names,
+    Transpylation,
+    Identifier,
+    Interned,
+    ValueType,
+)
 from .variables import value_expression, VALUE_TYPES
 
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_INF = sys.hash_info.inf
+# unnormalized terms beyond this are normalized eagerly to bound their growth
+_NORMALIZE_LIMIT = 1 << 64
+
 
 class PyInteger(int):
     def __truediv__(self, other):
         if isinstance(other, PyInteger):
-            return PyFraction(int(self), int(other))
+            return PyRational(int(self), int(other))
         return NotImplemented
 
 
-@attr.s(frozen=True, auto_attribs=True)
-class Integer(Expression[PyInteger]):
+def divide(lhs, rhs):
+    """Divide two values, creating a rational if both are integers"""
+    if isinstance(lhs, int) and isinstance(rhs, int):
+        return PyRational(lhs, rhs)
+    return lhs / rhs
+
+
+# === Rational values ===
+def _terms(value) -> Tuple[int, int]:
+    """Get the numerator and denominator of a rational, or raise ``TypeError``"""
+    if type(value) is PyRational:
+        return value._numerator, value._denominator
+    if isinstance(value, int):
+        return int(value), 1
+    if isinstance(value, numbers.Rational):
+        return value.numerator, value.denominator
+    raise TypeError
+
+
+def _inexact(operation, lhs, rhs):
+    """Apply ``operation`` via ``float`` if an operand is inexact, if possible"""
+    if isinstance(rhs, (float, complex)):
+        return operation(float(lhs), rhs)
+    if isinstance(lhs, (float, complex)):
+        return operation(lhs, float(rhs))
+    return NotImplemented
+
+
+def _rational(numerator: int, denominator: int) -> "PyRational":
+    """Create a rational from terms, assuming the ``denominator`` is positive"""
+    self = object.__new__(PyRational)
+    self._numerator = numerator
+    self._denominator = denominator
+    self._normalized = denominator == 1
+    if denominator > _NORMALIZE_LIMIT:
+        self._normalize()
+    return self
+
+
+class PyRational:
+    """
+    Rational number optimised for arithmetic on small operands
+
+    This is a drop-in replacement for :py:class:`fractions.Fraction`: values
+    compare and hash equal to the equivalent ``Fraction`` and ``int``, and
+    show the same ``str``. Arithmetic with integers has dedicated fast paths,
+    and reducing terms by their greatest common divisor is deferred until
+    the terms are inspected or grow large.
+    """
+
+    __slots__ = ("_numerator", "_denominator", "_normalized")
+
+    def __init__(self, numerator: int = 0, denominator: int = 1):
+        if isinstance(numerator, int) and isinstance(denominator, int):
+            numerator, denominator = int(numerator), int(denominator)
+        else:
+            try:
+                (numerator, lhs_denominator), (rhs_numerator, denominator) = (
+                    _terms(numerator),
+                    _terms(denominator),
+                )
+            except TypeError:
+                raise TypeError(
+                    f"PyRational({numerator!r}, {denominator!r}) needs rational terms"
+                ) from None
+            numerator, denominator = (
+                numerator * denominator,
+                lhs_denominator * rhs_numerator,
+            )
+        if denominator == 0:
+            raise ZeroDivisionError(f"PyRational({numerator}, 0)")
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        self._numerator = numerator
+        self._denominator = denominator
+        self._normalized = denominator == 1
+
+    def _normalize(self):
+        if not self._normalized:
+            divisor = gcd(self._numerator, self._denominator)
+            if divisor != 1:
+                self._numerator //= divisor
+                self._denominator //= divisor
+            self._normalized = True
+
+    @property
+    def numerator(self) -> int:
+        self._normalize()
+        return self._numerator
+
+    @property
+    def denominator(self) -> int:
+        self._normalize()
+        return self._denominator
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return _rational(
+                self._numerator + int(other) * self._denominator, self._denominator
+            )
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.add, self, other)
+        if denominator == self._denominator:
+            return _rational(self._numerator + numerator, denominator)
+        return _rational(
+            self._numerator * denominator + numerator * self._denominator,
+            self._denominator * denominator,
+        )
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, int):
+            return _rational(
+                self._numerator - int(other) * self._denominator, self._denominator
+            )
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.sub, self, other)
+        if denominator == self._denominator:
+            return _rational(self._numerator - numerator, denominator)
+        return _rational(
+            self._numerator * denominator - numerator * self._denominator,
+            self._denominator * denominator,
+        )
+
+    def __rsub__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.sub, other, self)
+        return _rational(
+            numerator * self._denominator - self._numerator * denominator,
+            self._denominator * denominator,
+        )
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            return _rational(self._numerator * int(other), self._denominator)
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.mul, self, other)
+        return _rational(self._numerator * numerator, self._denominator * denominator)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.truediv, self, other)
+        return self._divide(
+            self._numerator * denominator, self._denominator * numerator
+        )
+
+    def __rtruediv__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.truediv, other, self)
+        return self._divide(
+            numerator * self._denominator, denominator * self._numerator
+        )
+
+    def __floordiv__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.floordiv, self, other)
+        return (self._numerator * denominator) // (self._denominator * numerator)
+
+    def __rfloordiv__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.floordiv, other, self)
+        return (numerator * self._denominator) // (denominator * self._numerator)
+
+    def __mod__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.mod, self, other)
+        return _rational(
+            (self._numerator * denominator) % (self._denominator * numerator),
+            self._denominator * denominator,
+        )
+
+    def __rmod__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.mod, other, self)
+        return _rational(
+            (numerator * self._denominator) % (denominator * self._numerator),
+            self._denominator * denominator,
+        )
+
+    def __divmod__(self, other):
+        return self // other, self % other
+
+    def __rdivmod__(self, other):
+        return other // self, other % self
+
+    def __pow__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.pow, self, other)
+        if denominator != 1:
+            # the terms of an exponent may not be normalized yet
+            divisor = gcd(numerator, denominator)
+            numerator, denominator = numerator // divisor, denominator // divisor
+        if denominator != 1:
+            # roots are generally irrational, as for ``fractions.Fraction``
+            return float(self) ** (numerator / denominator)
+        if numerator >= 0:
+            return _rational(self._numerator**numerator, self._denominator**numerator)
+        return self._divide(self._denominator**-numerator, self._numerator**-numerator)
+
+    def __rpow__(self, other):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            return _inexact(operator.pow, other, self)
+        return PyRational(numerator, denominator) ** self
+
+    @staticmethod
+    def _divide(numerator: int, denominator: int) -> "PyRational":
+        if denominator > 0:
+            return _rational(numerator, denominator)
+        elif denominator < 0:
+            return _rational(-numerator, -denominator)
+        raise ZeroDivisionError("division by zero")
+
+    def __neg__(self):
+        return _rational(-self._numerator, self._denominator)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return _rational(abs(self._numerator), self._denominator)
+
+    def __trunc__(self):
+        return int(self)
+
+    def __floor__(self):
+        return self._numerator // self._denominator
+
+    def __ceil__(self):
+        return -(-self._numerator // self._denominator)
+
+    def __round__(self, ndigits: Optional[int] = None):
+        if ndigits is not None:
+            shift = 10 ** abs(ndigits)
+            if ndigits > 0:
+                return PyRational(round(self * shift), shift)
+            return PyRational(round(self / shift) * shift)
+        # round half to even, as for ``fractions.Fraction``
+        whole, remainder = divmod(self._numerator, self._denominator)
+        if remainder * 2 > self._denominator or (
+            remainder * 2 == self._denominator and whole % 2
+        ):
+            return whole + 1
+        return whole
+
+    @property
+    def real(self) -> "PyRational":
+        return self
+
+    @property
+    def imag(self) -> int:
+        return 0
+
+    def conjugate(self) -> "PyRational":
+        return self
+
+    def __complex__(self):
+        return complex(float(self))
+
+    def _compare(self, other, compare):
+        try:
+            numerator, denominator = _terms(other)
+        except TypeError:
+            if isinstance(other, float):
+                return compare(float(self), other)
+            return NotImplemented
+        return compare(self._numerator * denominator, numerator * self._denominator)
+
+    def __eq__(self, other):
+        return self._compare(other, operator.eq)
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge)
+
+    def __hash__(self):
+        # same algorithm as for ``fractions.Fraction`` and ``int``
+        self._normalize()
+        numerator, denominator = self._numerator, self._denominator
+        if denominator == 1:
+            return hash(numerator)
+        inverse = pow(denominator, _HASH_MODULUS - 2, _HASH_MODULUS)
+        if not inverse:
+            result = _HASH_INF
+        else:
+            result = hash(hash(abs(numerator)) * inverse)
+        result = result if numerator >= 0 else -result
+        return -2 if result == -1 else result
+
+    def __bool__(self):
+        return self._numerator != 0
+
+    def __float__(self):
+        return self._numerator / self._denominator
+
+    def __int__(self):
+        if self._numerator < 0:
+            return -(-self._numerator // self._denominator)
+        return self._numerator // self._denominator
+
+    def __reduce__(self):
+        return PyRational, (self.numerator, self.denominator)
+
+    def __str__(self):
+        self._normalize()
+        if self._denominator == 1:
+            return str(self._numerator)
+        return f"{self._numerator}/{self._denominator}"
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.numerator}, {self.denominator})"
+
+
+numbers.Rational.register(PyRational)
+
+
+@attr.s(frozen=True, auto_attribs=True, slots=True, eq=False)
+class Integer(Expression[PyInteger], metaclass=Interned):
     value: int
-    names = Names(bound={"__PyInteger__": PyInteger})
+    names = Names()
 
     def specialize(self, namespace: Mapping[Identifier, Any]):
         return self
 
+    def value_type(self, types: Mapping[Identifier, ValueType]) -> ValueType:
+        return ValueType.INTEGER
+
     def transpyle(self):
-        return Transpylation(self, f"__PyInteger__({self.value})")
+        # integers are inlined as plain constants, since every division of
+        # integers is transpyled to create a rational explicitly
+        return Transpylation(self, f"{self.value}")
 
     def evaluate(self, namespace: Mapping[Identifier, Any]) -> int:
         return PyInteger(self.value)
@@ -37,22 +408,25 @@ def int_expression(value: int):
     return Integer(value)
 
 
-@attr.s(frozen=True, auto_attribs=True)
-class Fraction(Expression[PyFraction]):
+@attr.s(frozen=True, auto_attribs=True, slots=True, eq=False)
+class Fraction(Expression[PyRational], metaclass=Interned):
     numerator: int
     denominator: int
-    names = Names(bound={"__PyFraction__": PyFraction})
+    names = Names(bound={"__PyRational__": PyRational})
 
     def specialize(self, namespace: Mapping[Identifier, Any]):
         return self
 
+    def value_type(self, types: Mapping[Identifier, ValueType]) -> ValueType:
+        return ValueType.RATIONAL
+
     def transpyle(self):
         return Transpylation(
-            self, f"__PyFraction__({self.numerator}, {self.denominator})"
+            self, f"__PyRational__({self.numerator}, {self.denominator})"
         )
 
     def evaluate(self, namespace: Mapping[Identifier, Any]):
-        return PyFraction(self.numerator, self.denominator)
+        return PyRational(self.numerator, self.denominator)
 
 
 VALUE_TYPES.add(Fraction)
@@ -61,3 +435,8 @@ VALUE_TYPES.add(Fraction)
 @value_expression.register(PyFraction)
 def fraction_expression(value: PyFraction):
     return Fraction(numerator=value.numerator, denominator=value.denominator)
+
+
+@value_expression.register(PyRational)
+def rational_expression(value: PyRational):
+    return Fraction(numerator=value.numerator, denominator=value.denominator)
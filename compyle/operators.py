@@ -1,24 +1,73 @@
-from typing import Mapping, Any
+from typing import Any, Callable, Dict, Tuple
+import operator
 
 import attr
 
-from .transpyle import CompoundExpression, Transpylation, Identifier
+from .transpyle import (
+    CompylationError,
+    CompoundExpression,
+    Expression,
+    Names,
+    ValueType,
+    merge_names,
+)
 from .variables import value_expression, VALUE_TYPES
+from .numbers import PyRational, divide
 
+#: Python implementation of each operator symbol, used for constant folding
+BINARY_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
 
-@attr.s(frozen=True, auto_attribs=True)
+#: names needed by the code of divisions
+DIVISION_NAMES = Names(bound={"__PyRational__": PyRational, "__divide__": divide})
+
+
+@attr.s(frozen=True, auto_attribs=True, slots=True, eq=False)
 class OperatorBinary(CompoundExpression):
     symbol: str
 
-    def specialize(self, namespace: Mapping[Identifier, Any]):
-        lhs, rhs = (child.specialize(namespace) for child in self.children)
-        specialization = OperatorBinary(children=(lhs, rhs), symbol=self.symbol)
+    def combine(self, lhs: Expression, rhs: Expression) -> Expression:
         if type(lhs) in VALUE_TYPES and type(rhs) in VALUE_TYPES:
-            return value_expression(specialization.evaluate(namespace))
-        return specialization
-
-    def transpyle(self):
-        lhs, rhs = self.children
-        return Transpylation(
-            self, f"{lhs.transpyle().source} {self.symbol} {rhs.transpyle().source}"
-        )
+            return value_expression(self.fold(lhs, rhs))
+        return OperatorBinary(children=(lhs, rhs), symbol=self.symbol)
+
+    def fold(self, lhs, rhs):
+        """Compute the value of this operator for the value expressions ``lhs, rhs``"""
+        try:
+            implementation = BINARY_OPERATORS[self.symbol]
+        except KeyError:
+            raise CompylationError(f"no implementation for operator {self.symbol!r}")
+        # value expressions are constants; their namespace is irrelevant
+        return implementation(lhs.evaluate({}), rhs.evaluate({}))
+
+    def _compute_names(self):
+        if self._names is None:
+            names = [child.names for child in self.children]
+            if self.symbol == "/":
+                names.append(DIVISION_NAMES)
+            object.__setattr__(self, "_names", merge_names(names))
+
+    def combine_types(self, lhs: ValueType, rhs: ValueType) -> ValueType:
+        if self.symbol == "/":
+            return ValueType.RATIONAL
+        if lhs is ValueType.INTEGER and rhs is ValueType.INTEGER:
+            return ValueType.INTEGER
+        if lhs is ValueType.RATIONAL or rhs is ValueType.RATIONAL:
+            return ValueType.RATIONAL
+        return ValueType.ANY
+
+    def fragments(
+        self, lhs: ValueType = ValueType.ANY, rhs: ValueType = ValueType.ANY
+    ) -> Tuple[str, str, str]:
+        if self.symbol == "/":
+            # Integers do not divide to rationals by themselves. Rationals do,
+            # even with an integer on one side.
+            if lhs is ValueType.INTEGER and rhs is ValueType.INTEGER:
+                return "__PyRational__(", ", ", ")"
+            if lhs is not ValueType.RATIONAL and rhs is not ValueType.RATIONAL:
+                return "__divide__(", ", ", ")"
+        return "(", f" {self.symbol} ", ")"
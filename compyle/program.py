@@ -0,0 +1,331 @@
+"""
+Whole-program compilation of statements
+
+Where ``interpret.eval`` handles one statement after another, this module
+compiles an entire *Toy Language Program* to a single Python generator function.
+Each assignment becomes a local function of the generator, and each evaluation
+yields the value of its expression.
+
+For example, the program::
+
+    foo := 2 : 3
+    bar := foo / 3
+    >>> bar
+
+is compiled to the Python code::
+
+    def __program__():
+        __values__ = {}
+        _v_foo = __memoized__(__values__, 'foo', lambda: __PyRational__(2, 3))
+        _v_bar = __memoized__(__values__, 'bar', lambda: (_v_foo() / 3))
+        _v_foo()
+        _v_bar()
+        yield _v_bar()
+
+Since the local functions are closures, references are late-bound exactly as
+for the interpreter: reassigning ``foo`` later on changes the value of ``bar``.
+The value of each name is computed at most once until a name is reassigned.
+Statements are executed in order, so whether a name is defined at each
+evaluation is known during compilation; evaluations of undefined names or
+of names that depend on themselves yield the same error messages as for the
+interpreter. Likewise, the types of names at each evaluation are known, so
+divisions of integers are compiled to create rationals directly. Before
+each evaluation, the names it needs are computed in order of their
+dependencies, so that no chain of names is computed recursively. Code
+nested deeper than Python can compile is split into temporaries.
+"""
+from typing import (
+    Iterable,
+    Union,
+    Dict,
+    Any,
+    Iterator,
+    Optional,
+    Mapping,
+    Callable,
+    List,
+    Set,
+    Tuple,
+)
+from functools import singledispatch
+from types import CodeType
+
+import attr
+
+from .transpyle import (
+    Expression,
+    Identifier,
+    CompylationError,
+    EvaluationError,
+    ValueType,
+    MAX_NESTING,
+    infer_types,
+    post_order,
+    reference_types,
+)
+from .variables import Reference
+from .operators import OperatorBinary, DIVISION_NAMES
+from .interpret import Assign, CyclicReference, Evaluate, Failure, resolution_order
+from ._debug import debug_print, DEBUG_CHANNEL
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Program:
+    """A compiled program, producing the value of each evaluation when run"""
+
+    source: str
+    code: CodeType
+    #: global names required by the ``code``
+    bound: Mapping[Identifier, Any]
+
+    def run(self) -> Iterator[Any]:
+        namespace = dict(self.bound)
+        exec(self.code, namespace)
+        return namespace["__program__"]()
+
+
+def eval_compiled(instructions: Iterable[Union[Assign, Evaluate]]):
+    """Evaluate a series of instructions by compiling them to one program"""
+    yield from compile_program(instructions).run()
+
+
+def compile_program(instructions: Iterable[Union[Assign, Evaluate]]) -> Program:
+    """Compile a series of instructions to one program"""
+    builder = ProgramBuilder()
+    for instruction in instructions:
+        if type(instruction) is Assign:
+            builder.add_assign(instruction)
+        elif type(instruction) is Evaluate:
+            builder.add_evaluate(instruction)
+        else:
+            raise EvaluationError(f"Unknown instruction: {instruction}")
+    return builder.build()
+
+
+def local_name(identifier: Identifier) -> str:
+    """The name of the local function representing ``identifier``"""
+    return f"_v_{identifier}"
+
+
+def references(expression: Expression) -> Iterator[Identifier]:
+    """Iterate over the names referenced by ``expression``, in order of evaluation"""
+    seen: Set[int] = set()
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        if type(expression) is Reference:
+            yield expression.identifier
+        elif id(expression) not in seen:
+            # repeated subexpressions contain no further names to search
+            seen.add(id(expression))
+            stack.extend(reversed(getattr(expression, "children", ())))
+
+
+# === Runtime Support ===
+def memoized(
+    values: Dict[Identifier, Any], name: Identifier, thunk: Callable[[], Any]
+) -> Callable[[], Any]:
+    """Wrap the ``thunk`` computing ``name`` to store its value in ``values``"""
+
+    def value():
+        try:
+            return values[name]
+        except KeyError:
+            result = values[name] = thunk()
+            return result
+
+    return value
+
+
+#: names needed by the code of assignments
+RUNTIME_NAMES = {"__memoized__": memoized}
+
+
+class ProgramBuilder:
+    """Incrementally build the source code of a program"""
+
+    def __init__(self):
+        self.lines = ["def __program__():", "    __values__ = {}"]
+        self.bound: Dict[Identifier, Any] = dict(RUNTIME_NAMES)
+        #: the expression currently assigned to each name
+        self.scope: Dict[Identifier, Expression] = {}
+        #: the type of each subexpression of the statement being emitted
+        self.types: Dict[Expression, ValueType] = {}
+        self._unbound: Dict[Identifier, Optional[Identifier]] = {}
+        #: names whose values are known to be stored in ``__values__``
+        self._computed: Set[Identifier] = set()
+
+    def bind(self, value: Any) -> str:
+        """Make ``value`` available under a global name and return the name"""
+        name = f"__bound_{len(self.bound)}__"
+        self.bound[name] = value
+        return name
+
+    def require(self, bound: Mapping[Identifier, Any], owner: Expression):
+        """Make the ``bound`` names needed by the code of ``owner`` available"""
+        for name, value in bound.items():
+            if self.bound.setdefault(name, value) is not value:
+                raise CompylationError(f"conflicting bound name {name!r} in {owner!r}")
+
+    def add_assign(self, instruction: Assign):
+        try:
+            expression = instruction.expression.specialize({})
+        except (ArithmeticError, CompylationError) as err:
+            self._add_raise(err)
+        else:
+            if instruction.name in self.scope and self._computed:
+                # values of other names may depend on the previous expression
+                self.lines.append("    __values__.clear()")
+                self._computed.clear()
+            self.scope[instruction.name] = expression
+            self._unbound.clear()
+            # names are late-bound, so their types may still change
+            self.types = infer_types(expression)
+            name = local_name(instruction.name)
+            temporaries, code = self.emit_code(expression)
+            if temporaries:
+                # statements need a function instead of a lambda
+                self.lines.append(f"    def {name}():")
+                self.lines.extend(f"        {statement}" for statement in temporaries)
+                self.lines.append(f"        return {code}")
+                code = name
+            else:
+                code = f"lambda: {code}"
+            self.lines.append(
+                f"    {name} = __memoized__(__values__, {instruction.name!r}, {code})"
+            )
+
+    def add_evaluate(self, instruction: Evaluate):
+        try:
+            expression = instruction.expression.specialize({})
+        except (ArithmeticError, CompylationError) as err:
+            self._add_raise(err)
+            return
+        unbound = self.first_unbound(expression)
+        if unbound is not None:
+            self._add_failure(f"NameError: name {unbound!r} is not defined")
+            return
+        try:
+            order = self.resolution_order(expression)
+        except CyclicReference as err:
+            self._add_failure(f"RecursionError: name {err.name!r} refers to itself")
+            return
+        self.lines.extend(f"    {local_name(name)}()" for name in order)
+        self._computed.update(order)
+        self.types = infer_types(expression, reference_types(expression, self.scope))
+        temporaries, code = self.emit_code(expression)
+        self.lines.extend(f"    {statement}" for statement in temporaries)
+        self.lines.append(f"    yield {code}")
+
+    def emit_code(self, root: Expression) -> Tuple[List[str], str]:
+        """
+        Create the code of ``root`` and the statements to run before it
+
+        Python rejects deeply nested code, so subexpressions are assigned to
+        temporaries by the statements before ``MAX_NESTING`` is exceeded.
+        """
+        codes: Dict[Expression, str] = {}
+        depths: Dict[Expression, int] = {}
+        temporaries: List[str] = []
+        for expression in post_order(root):
+            children = getattr(expression, "children", ())
+            code = emit(expression, self, [codes[child] for child in children])
+            depth = 1 + max((depths[child] for child in children), default=0)
+            if depth >= MAX_NESTING:
+                name = f"__t{len(temporaries)}__"
+                temporaries.append(f"{name} = {code}")
+                code, depth = name, 1
+            codes[expression], depths[expression] = code, depth
+        return temporaries, codes[root]
+
+    def _add_raise(self, err: BaseException):
+        self.lines.append(f"    raise {self.bind(err)}")
+
+    def _add_failure(self, message: str):
+        self.lines.append(f"    yield {self.bind(Failure(message))}")
+
+    def first_unbound(self, expression: Expression) -> Optional[Identifier]:
+        """The first name that cannot be resolved when evaluating ``expression``"""
+        # Each frame searches the references of a name, and the search of a
+        # name continues once the search of its current reference is done.
+        # An explicit stack of frames works for chains of names of any length.
+        frames: List[Tuple[Optional[Identifier], Iterator[Identifier]]] = [
+            (None, references(expression))
+        ]
+        while frames:
+            for reference in frames[-1][1]:
+                if reference not in self.scope:
+                    unbound: Optional[Identifier] = reference
+                else:
+                    try:
+                        unbound = self._unbound[reference]
+                    except KeyError:
+                        # mark as resolvable while searching to stop at cycles
+                        self._unbound[reference] = None
+                        frames.append((reference, references(self.scope[reference])))
+                        break
+                if unbound is not None:
+                    # every name being searched depends on the unbound name
+                    for name, _ in frames[1:]:
+                        self._unbound[name] = unbound
+                    return unbound
+            else:
+                frames.pop()
+        return None
+
+    def resolution_order(self, expression: Expression) -> List[Identifier]:
+        """
+        The names to compute before evaluating ``expression``, dependencies first
+
+        Names that are already computed are skipped. Names are searched in the
+        same order as by the interpreter, so that the same ``CyclicReference``
+        is raised for names that depend on themselves.
+        """
+        known = set(self._computed)
+        order: List[Identifier] = []
+        for name in expression.names.free:
+            for dependency in resolution_order(name, self.scope, known):
+                known.add(dependency)
+                order.append(dependency)
+        return order
+
+    def build(self) -> Program:
+        if len(self.lines) == 2:
+            self.lines.append("    yield from ()")
+        source = "\n".join(self.lines) + "\n"
+        debug_print(DEBUG_CHANNEL.TRANSPYLE, source)
+        code = compile(source, "<program>", "exec", dont_inherit=True)
+        return Program(source=source, code=code, bound=self.bound)
+
+
+@singledispatch
+def emit(expression: Expression, program: ProgramBuilder, children: List[str]) -> str:
+    """
+    Create the Python source code computing ``expression`` in a ``program``
+
+    The code of the ``children`` of ``expression`` is created beforehand.
+    This is a ``singledispatch`` function. Expressions without a registered rule
+    must not have free names; they are emitted as their regular transpylation.
+    """
+    if expression.names.free:
+        raise CompylationError(f"no program emitter for {expression!r}")
+    program.require(expression.names.bound, expression)
+    return expression.transpyle().source
+
+
+@emit.register(Reference)
+def emit_reference(
+    expression: Reference, program: ProgramBuilder, children: List[str]
+) -> str:
+    return f"{local_name(expression.identifier)}()"
+
+
+@emit.register(OperatorBinary)
+def emit_binary_operator(
+    expression: OperatorBinary, program: ProgramBuilder, children: List[str]
+) -> str:
+    lhs, rhs = expression.children
+    prefix, infix, suffix = expression.fragments(program.types[lhs], program.types[rhs])
+    if expression.symbol == "/":
+        program.require(DIVISION_NAMES.bound, expression)
+    return f"{prefix}{children[0]}{infix}{children[1]}{suffix}"
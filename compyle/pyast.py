@@ -0,0 +1,210 @@
+"""
+Transpylation to Python syntax trees instead of source code
+
+The default backend creates Python source code for expressions, which
+``compile`` must tokenize and parse again. This backend instead builds the
+``ast`` tree of the code directly and compiles it, while still computing equal
+subexpressions only once. The source code of a tree is only created if needed,
+for example to show it for debugging.
+
+Since ``ast.Constant`` can only hold plain literals, bound objects such as the
+types of values are made available as global names, exactly as for source
+code. Use ``BACKEND.tree = True`` of the ``transpyle`` module, or ``--ast`` on
+the command line, to transpyle all compound expressions with this backend.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Generic, Tuple
+from functools import singledispatch
+import ast
+import sys
+
+import attr
+
+from .transpyle import (
+    CODE_CACHE,
+    CompoundExpression,
+    CompylationError,
+    E,
+    Expression,
+    Identifier,
+    T,
+    ValueType,
+    infer_types,
+    post_order,
+    shared_subexpressions,
+    transpyle_shared,
+)
+from .variables import Reference
+from .numbers import Integer, Fraction
+from .operators import OperatorBinary
+from ._debug import PROFILE, profile_call
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class TreeTranspylation(Generic[E, T]):
+    """An expression transpiled to a Python syntax tree"""
+
+    parent: E
+    #: the known types of free names, as sorted ``(name, type)`` pairs
+    free_types: Tuple[Tuple[Identifier, ValueType], ...] = ()
+    _tree: Optional[ast.Expression] = attr.ib(init=False, default=None)
+
+    @property
+    def tree(self) -> ast.Expression:
+        if self._tree is None:
+            tree = transpyle_tree(self.parent, dict(self.free_types))
+            object.__setattr__(self, "_tree", tree)
+        return self._tree
+
+    @property
+    def source(self) -> str:
+        """the source code of the tree"""
+        if hasattr(ast, "unparse"):
+            return ast.unparse(self.tree)
+        # Python versions before 3.9 cannot unparse trees
+        return transpyle_shared(self.parent, dict(self.free_types))
+
+    def evaluate(self, namespace: "Mapping[Identifier, Expression]") -> T:
+        bound = self.parent.names.bound
+        assert not any(name in namespace for name in bound)
+        # trees are only built if their code is not cached yet
+        key = (self.parent, self.free_types) if self.free_types else self.parent
+        code = CODE_CACHE.compile_tree(key, lambda: self.tree)
+        globals = {"__namespace__": namespace, **bound}
+        if PROFILE.enabled:
+            return profile_call("eval", eval, code, globals)
+        return eval(code, globals)
+
+
+def transpyle_tree(
+    root: Expression, types: Mapping[Identifier, ValueType] = {}
+) -> ast.Expression:
+    """Create the ``eval`` mode tree of ``root``, computing equal subexpressions once"""
+    inferred = infer_types(root, types)
+    shared = shared_subexpressions(root)
+    trees: Dict[Expression, ast.expr] = {}
+    temporaries: List[Expression] = []
+    names: Dict[Expression, str] = {}
+    for expression in post_order(root):
+        if (
+            not isinstance(expression, CompoundExpression)
+            and expression is not root
+            and expression not in shared
+        ):
+            # literals are as cheap to create per use as to share
+            continue
+        child_expressions = getattr(expression, "children", ())
+        children = []
+        for child in child_expressions:
+            if child in names:
+                children.append(_name(names[child]))
+            elif isinstance(child, CompoundExpression):
+                children.append(trees.pop(child))
+            else:
+                children.append(to_tree(child, [], []))
+        child_types = [inferred[child] for child in child_expressions]
+        trees[expression] = to_tree(expression, children, child_types)
+        if expression in shared:
+            names[expression] = f"__cse{len(temporaries)}__"
+            temporaries.append(expression)
+    body = trees[root]
+    # temporaries are defined before any temporaries that depend on them
+    for expression in reversed(temporaries):
+        body = ast.Call(
+            func=_lambda(names[expression], body), args=[trees[expression]], keywords=[]
+        )
+    return ast.fix_missing_locations(ast.Expression(body=body))
+
+
+def _lambda(name: str, body: ast.expr) -> ast.Lambda:
+    """Create the tree of ``lambda name: body``"""
+    arguments = ast.arguments(
+        args=[ast.arg(arg=name, annotation=None)],
+        vararg=None,
+        kwonlyargs=[],
+        kw_defaults=[],
+        kwarg=None,
+        defaults=[],
+    )
+    if sys.version_info >= (3, 8):
+        arguments.posonlyargs = []
+    return ast.Lambda(args=arguments, body=body)
+
+
+def _name(identifier: str) -> ast.Name:
+    return ast.Name(id=identifier, ctx=ast.Load())
+
+
+def _call(function: ast.expr, *args: ast.expr) -> ast.Call:
+    return ast.Call(func=function, args=list(args), keywords=[])
+
+
+# === Syntax Trees of Expressions ===
+@singledispatch
+def to_tree(
+    expression: Expression, children: List[ast.expr], types: List[ValueType]
+) -> ast.expr:
+    """
+    Create the tree computing ``expression`` given the trees of its ``children``
+
+    The ``types`` are the inferred types of the values of the ``children``.
+
+    This is a ``singledispatch`` function. There is no fallback for expressions
+    without a registered rule.
+    """
+    raise CompylationError(f"no syntax tree for {expression!r}")
+
+
+@to_tree.register(Integer)
+def integer_tree(
+    expression: Integer, children: List[ast.expr], types: List[ValueType]
+) -> ast.expr:
+    return ast.Constant(value=expression.value)
+
+
+@to_tree.register(Fraction)
+def fraction_tree(
+    expression: Fraction, children: List[ast.expr], types: List[ValueType]
+) -> ast.expr:
+    return _call(
+        _name("__PyRational__"),
+        ast.Constant(value=expression.numerator),
+        ast.Constant(value=expression.denominator),
+    )
+
+
+@to_tree.register(Reference)
+def reference_tree(
+    expression: Reference, children: List[ast.expr], types: List[ValueType]
+) -> ast.expr:
+    index: Any = ast.Constant(value=expression.identifier)
+    if sys.version_info < (3, 9):
+        index = ast.Index(value=index)
+    lookup = ast.Subscript(value=_name("__namespace__"), slice=index, ctx=ast.Load())
+    evaluate = ast.Attribute(value=lookup, attr="evaluate", ctx=ast.Load())
+    return _call(evaluate, _name("__namespace__"))
+
+
+#: syntax tree operator of each operator symbol
+TREE_OPERATORS = {
+    "+": ast.Add,
+    "-": ast.Sub,
+    "*": ast.Mult,
+    "/": ast.Div,
+}
+
+
+@to_tree.register(OperatorBinary)
+def binary_tree(
+    expression: OperatorBinary, children: List[ast.expr], types: List[ValueType]
+) -> ast.expr:
+    try:
+        operator = TREE_OPERATORS[expression.symbol]
+    except KeyError:
+        raise CompylationError(f"no syntax tree for operator {expression.symbol!r}")
+    lhs, rhs = children
+    if expression.symbol == "/" and ValueType.RATIONAL not in types:
+        # as for the source code, integers must be divided explicitly
+        if types == [ValueType.INTEGER, ValueType.INTEGER]:
+            return _call(_name("__PyRational__"), lhs, rhs)
+        return _call(_name("__divide__"), lhs, rhs)
+    return ast.BinOp(left=lhs, op=operator(), right=rhs)
@@ -0,0 +1,129 @@
+"""
+Network server for concurrent interpreter sessions
+
+Every connection to the server is an independent session with its own
+namespace. Clients send statements line by line and receive one line for each
+evaluation, containing its result or an error message. Statements are parsed
+and evaluated in an executor, so that a large or slow statement of one session
+does not stall any other sessions. Assignments are applied by the server
+itself, so that only evaluations send a snapshot of the namespace along.
+
+For example, a session may look like this::
+
+    $ python3 -m compyle --serve 127.0.0.1:8080 &
+    $ printf 'a := 3\\n>>> a * 2\\n>>> b\\n' | nc 127.0.0.1 8080
+    6
+    NameError: name 'b' is not defined
+"""
+from typing import Any, Optional, Tuple, Union
+from concurrent.futures import Executor
+import asyncio
+import functools
+
+import pyparsing as pp
+
+from .frontend import parse_statement
+from .interpret import Assign, Evaluate, Failure, eval_assign, eval_evaluate
+from .namespace import Namespace
+from .transpyle import CompylationError, EvaluationError
+
+#: errors of a statement that are reported as its result
+STATEMENT_ERRORS = (Exception, EvaluationError, CompylationError)
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    Parse an ``address`` as a ``(host, port)`` pair or a Unix socket path
+
+    Addresses containing a ``/`` are Unix socket paths. Other addresses are
+    either a ``HOST:PORT`` or just a ``PORT`` on localhost.
+    """
+    if "/" in address:
+        return address
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+async def start(
+    address: Union[str, Tuple[str, int]], executor: Optional[Executor] = None
+) -> asyncio.AbstractServer:
+    """Start a server listening on ``address``"""
+    handler = functools.partial(handle_session, executor=executor)
+    if isinstance(address, str):
+        return await asyncio.start_unix_server(handler, path=address)
+    host, port = address
+    return await asyncio.start_server(handler, host=host, port=port)
+
+
+def serve(address: Union[str, Tuple[str, int]], executor: Optional[Executor] = None):
+    """Run a server listening on ``address`` until interrupted"""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start(address, executor))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+async def handle_session(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    executor: Optional[Executor] = None,
+):
+    """Interpret the statements of one connection in its own namespace"""
+    loop = asyncio.get_event_loop()
+    namespace = Namespace()
+    try:
+        while True:
+            raw_line = await reader.readline()
+            if not raw_line:
+                break
+            line = raw_line.decode(errors="replace").strip()
+            if not line:
+                continue
+            instruction = await loop.run_in_executor(executor, parse_request, line)
+            if type(instruction) is Assign:
+                try:
+                    namespace = eval_assign(instruction, namespace)
+                    continue
+                except STATEMENT_ERRORS as err:
+                    result = failure(err)
+            elif type(instruction) is Evaluate:
+                result = await loop.run_in_executor(
+                    executor, evaluate_request, instruction, namespace
+                )
+            else:
+                result = instruction
+            writer.write(f"{result}\n".encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def failure(err: BaseException) -> Failure:
+    """The ``Failure`` reporting ``err`` as the result of a statement"""
+    if isinstance(err, pp.ParseBaseException):
+        return Failure(f"SyntaxError: {err}")
+    return Failure(f"{type(err).__name__}: {err}")
+
+
+def parse_request(line: str) -> Union[Assign, Evaluate, Failure]:
+    """Parse the statement of a ``line``, providing a ``Failure`` if it is invalid"""
+    try:
+        return parse_statement(line)
+    except STATEMENT_ERRORS as err:
+        return failure(err)
+
+
+def evaluate_request(instruction: Evaluate, namespace: Namespace) -> Any:
+    """Evaluate ``instruction``, providing a ``Failure`` for errors"""
+    try:
+        return eval_evaluate(instruction, namespace)
+    except STATEMENT_ERRORS as err:
+        return failure(err)
@@ -0,0 +1,205 @@
+"""
+Buffered writers of evaluation results in structured formats
+
+Printing each result on its own is slow for many results, and the printed text
+loses whether a result is an integer, a fraction or an error. A sink instead
+buffers records and writes them in large batches. Each record contains the
+index of its statement in the program - counting assignments as well - so
+that results can be matched to their statements.
+
+The formats are:
+
+``text``
+    the result as printed by the interpreter, one per line
+``jsonl``
+    one JSON object per line, such as ``{"index": 2, "type": "rational",
+    "numerator": 3, "denominator": 4}``
+``csv``
+    rows of ``index,type,numerator,denominator,message``
+``binary``
+    length-prefixed records of integer terms, readable via ``read_binary``
+
+Records have the type ``integer``, ``rational`` or ``error``. Integers carry
+the denominator ``1``, and errors carry their ``message`` instead of any terms.
+"""
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, Type, Union
+import csv
+import json
+import numbers
+import struct
+import types
+
+from .interpret import Failure
+from .numbers import PyRational
+
+#: default number of records to buffer before writing them
+BATCH_SIZE = 8192
+
+INTEGER, RATIONAL, ERROR = "integer", "rational", "error"
+
+
+def record_terms(result: Any) -> Tuple[str, int, int]:
+    """Get the type of the record of ``result``, its numerator and denominator"""
+    # check the common types directly, which is much faster than via ``numbers``
+    if type(result) is PyRational:
+        return RATIONAL, result.numerator, result.denominator
+    if type(result) is int:
+        return INTEGER, result, 1
+    if isinstance(result, numbers.Integral):
+        return INTEGER, int(result), 1
+    if isinstance(result, numbers.Rational):
+        return RATIONAL, result.numerator, result.denominator
+    raise TypeError(f"no record type for {result!r}")
+
+
+class ResultSink:
+    """Writer buffering the records of results for a ``stream``"""
+
+    #: whether the ``stream`` must be a binary instead of a text stream
+    binary = False
+    #: data written before any records
+    header: Union[str, bytes] = ""
+
+    def __init__(self, stream, batch_size: int = BATCH_SIZE):
+        self.stream = stream
+        self.batch_size = batch_size
+        self._buffer: List[Any] = [self.header] if self.header else []
+
+    def write(self, index: int, result: Any):
+        """Add the ``result`` of the statement at ``index``"""
+        self._buffer.append(self.format(index, result))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def format(self, index: int, result: Any) -> Union[str, bytes]:
+        """The record of the ``result`` of the statement at ``index``"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Write all buffered records"""
+        if self._buffer:
+            self.stream.write((b"" if self.binary else "").join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+        return False
+
+
+class TextSink(ResultSink):
+    """Sink of results as printed by the interpreter"""
+
+    def format(self, index: int, result: Any) -> str:
+        return f"{result}\n"
+
+
+class JsonLinesSink(ResultSink):
+    """Sink of results as one JSON object per line"""
+
+    def format(self, index: int, result: Any) -> str:
+        if type(result) is Failure:
+            return json.dumps({"index": index, "type": ERROR, "message": result}) + "\n"
+        kind, numerator, denominator = record_terms(result)
+        return (
+            f'{{"index": {index}, "type": "{kind}",'
+            f' "numerator": {numerator}, "denominator": {denominator}}}\n'
+        )
+
+
+class CsvSink(ResultSink):
+    """Sink of results as rows of comma separated values"""
+
+    header = "index,type,numerator,denominator,message\n"
+
+    def __init__(self, stream, batch_size: int = BATCH_SIZE):
+        super().__init__(stream, batch_size)
+        # rows are written directly to the buffer
+        self._writer = csv.writer(
+            types.SimpleNamespace(write=self._buffer.append), lineterminator="\n"
+        )
+
+    def write(self, index: int, result: Any):
+        if type(result) is Failure:
+            self._writer.writerow((index, ERROR, "", "", result))
+        else:
+            self._writer.writerow((index, *record_terms(result), ""))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+
+# === Binary Format ===
+# The binary format starts with a magic line, followed by one record per
+# result. Every record starts with the statement index and a type code,
+# followed by the numerator and denominator for values or the UTF-8 message
+# for errors. Integer terms and messages are prefixed by their length in bytes.
+_MAGIC = b"compyle-results-1\n"
+_RECORD = struct.Struct("<QB")
+_LENGTH = struct.Struct("<I")
+_TYPE_CODES = {INTEGER: 0, RATIONAL: 1, ERROR: 2}
+
+
+def _pack_int(value: int) -> bytes:
+    data = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+    return _LENGTH.pack(len(data)) + data
+
+
+class BinarySink(ResultSink):
+    """Sink of results as binary records of integer terms"""
+
+    binary = True
+    header = _MAGIC
+
+    def format(self, index: int, result: Any) -> bytes:
+        if type(result) is Failure:
+            message = result.encode()
+            return (
+                _RECORD.pack(index, _TYPE_CODES[ERROR])
+                + _LENGTH.pack(len(message))
+                + message
+            )
+        kind, numerator, denominator = record_terms(result)
+        if kind == INTEGER:
+            return _RECORD.pack(index, _TYPE_CODES[kind]) + _pack_int(numerator)
+        return (
+            _RECORD.pack(index, _TYPE_CODES[kind])
+            + _pack_int(numerator)
+            + _pack_int(denominator)
+        )
+
+
+def read_binary(stream: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """Read the ``(index, result)`` of each record written by a ``BinarySink``"""
+    if stream.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("not a compyle result stream")
+
+    def read_chunk() -> bytes:
+        (length,) = _LENGTH.unpack(stream.read(_LENGTH.size))
+        return stream.read(length)
+
+    while True:
+        head = stream.read(_RECORD.size)
+        if not head:
+            return
+        index, code = _RECORD.unpack(head)
+        if code == _TYPE_CODES[ERROR]:
+            yield index, Failure(read_chunk().decode())
+            continue
+        numerator = int.from_bytes(read_chunk(), "little", signed=True)
+        if code == _TYPE_CODES[INTEGER]:
+            yield index, numerator
+        else:
+            denominator = int.from_bytes(read_chunk(), "little", signed=True)
+            yield index, PyRational(numerator, denominator)
+
+
+#: sink type of each output format
+SINKS: Dict[str, Type[ResultSink]] = {
+    "text": TextSink,
+    "jsonl": JsonLinesSink,
+    "csv": CsvSink,
+    "binary": BinarySink,
+}
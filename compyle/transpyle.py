@@ -1,12 +1,34 @@
 """
 The interpreter/transpiler core definition
 """
-from typing import Optional, Mapping, Any, Callable, Set, TypeVar, Generic, Union, Tuple
+
+from typing import (
+    Optional,
+    Mapping,
+    Any,
+    Callable,
+    Set,
+    FrozenSet,
+    Sequence,
+    TypeVar,
+    Generic,
+    Union,
+    Tuple,
+    Dict,
+    List,
+    Iterator,
+)
 from typing_extensions import Protocol, runtime_checkable
-from collections import ChainMap
+from collections import OrderedDict
+from types import CodeType
+from functools import lru_cache
+import ast
+import enum
+import weakref
 
 import attr
 
+from ._debug import PROFILE, profile_call
 
 T = TypeVar("T")
 E = TypeVar("E", bound="Expression")
@@ -32,6 +54,25 @@ class EvaluationError(BaseException):
 Identifier = str
 
 
+# === Value Types ===
+# The type of a value is often known before evaluating an expression:
+# literals have a fixed type, and operators derive their type from their
+# operands. Knowing that a subexpression is an integer allows to use
+# plain integer arithmetic and create rationals only where needed.
+#
+# For example, ``(a + 2) / 4`` with an integer ``a`` adds plain integers
+# and only divides them as ``PyRational(a + 2, 4)``.
+
+
+class ValueType(enum.Enum):
+    """The statically known type of the value of an expression"""
+
+    INTEGER = "integer"
+    RATIONAL = "rational"
+    #: the type is not known before evaluation
+    ANY = "any"
+
+
 # === Expression Interfaces ===
 # The basic layout used to represent, specialize and transpile
 # computation/transformation instructions. Expressions represent
@@ -52,7 +93,7 @@ class Names(Protocol):
     """Names of an expression"""
 
     #: names which can still be bound to some value
-    free: Set[Identifier] = attr.ib(factory=set)
+    free: FrozenSet[Identifier] = attr.ib(factory=frozenset, converter=frozenset)
     #: names which represent some value
     bound: Mapping[Identifier, Any] = attr.ib(factory=dict)
 
@@ -62,6 +103,28 @@ class Names(Protocol):
         )
 
 
+def merge_names(all_names: "Sequence[Names]") -> Names:
+    """
+    Combine the names of several expressions into one flat index
+
+    The free names and bound mappings of the widest ``Names`` are reused if
+    they already contain those of all others, which is the common case for
+    nested expressions. The result must not be mutated.
+    """
+    widest = max(all_names, key=lambda names: len(names.free) + len(names.bound))
+    free, bound = widest.free, widest.bound
+    for names in all_names:
+        if names is widest:
+            continue
+        if not names.free <= free:
+            free = free | names.free
+        if names.bound is not bound and any(key not in bound for key in names.bound):
+            bound = {**bound, **names.bound}
+    if free is widest.free and bound is widest.bound:
+        return widest
+    return Names(free=free, bound=bound)
+
+
 @runtime_checkable
 class Expression(Protocol[T]):
     """Structure of every Expression"""
@@ -78,6 +141,10 @@ class Expression(Protocol[T]):
         """Create a new Expression to which all of ``namespace`` is bound already"""
         raise NotImplementedError
 
+    def value_type(self, types: "Mapping[Identifier, ValueType]") -> ValueType:
+        """The type of the value given the ``types`` of some names"""
+        return ValueType.ANY
+
     # === NOTE ===
     # If we wanted to support multiple backends (e.g. Python, C++, ...)
     # these would be single-dispatch methods. This would allow us to define
@@ -89,9 +156,131 @@ class Expression(Protocol[T]):
 
     def evaluate(self, namespace: "Mapping[Identifier, Expression]") -> T:
         """Evaluate the expression to its value"""
+        if PROFILE.enabled:
+            return profile_call("transpyle", self.transpyle).evaluate(namespace)
         return self.transpyle().evaluate(namespace)
 
 
+# === Code Cache ===
+# Transpylations are cheap to create but expensive to compile. Since
+# equal expressions always transpyle to the same source code, the
+# compiled code can be shared between all of them.
+#
+# For example, evaluating ``>>> (a * 3)`` repeatedly creates a new
+# Transpylation every time, but compiles ``__namespace__['a']...``
+# only once.
+
+
+class CodeCache:
+    """Bounded least-recently-used cache of compiled Python source code"""
+
+    def __init__(self, maxsize: int = 1024):
+        self._maxsize = maxsize
+        self._code: "OrderedDict[Any, CodeType]" = OrderedDict()
+        #: number of lookups served from the cache
+        self.hits = 0
+        #: number of lookups that required compilation
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        """maximum number of code objects to keep"""
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int):
+        if value < 0:
+            raise ValueError(f"maxsize must be non-negative, not {value}")
+        self._maxsize = value
+        while len(self._code) > value:
+            self._code.popitem(last=False)
+
+    def compile(self, source: str) -> CodeType:
+        """Get the code object for an ``eval`` mode ``source``"""
+        return self._lookup(source, source, lambda: source)
+
+    def compile_tree(self, key: Any, build: "Callable[[], ast.Expression]") -> CodeType:
+        """Get the code object for the ``eval`` mode tree of ``build()`` by ``key``"""
+        return self._lookup(key, "<ast>", build)
+
+    def _lookup(self, key: Any, filename: str, build: Callable[[], Any]) -> CodeType:
+        try:
+            code = self._code[key]
+        except KeyError:
+            self.misses += 1
+            if PROFILE.enabled:
+                code = profile_call(
+                    "compile", compile, build(), filename, "eval", dont_inherit=True
+                )
+            else:
+                code = compile(build(), filename, "eval", dont_inherit=True)
+            if self._maxsize > 0:
+                self._code[key] = code
+                if len(self._code) > self._maxsize:
+                    self._code.popitem(last=False)
+            return code
+        else:
+            self.hits += 1
+            self._code.move_to_end(key)
+            return code
+
+    def entries(self) -> Dict[str, CodeType]:
+        """The code objects of all cached sources"""
+        return {key: code for key, code in self._code.items() if type(key) is str}
+
+    def update(self, entries: Mapping[str, CodeType]):
+        """Add the code objects of sources, such as from ``entries``"""
+        for source, code in entries.items():
+            self._code[source] = code
+            self._code.move_to_end(source)
+        while len(self._code) > self._maxsize:
+            self._code.popitem(last=False)
+
+    def clear(self):
+        """Remove all code objects and reset the statistics"""
+        self._code.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._code)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(maxsize={self._maxsize}, size={len(self)},"
+            f" hits={self.hits}, misses={self.misses})"
+        )
+
+
+#: process-wide cache of all code compiled for Transpylations
+CODE_CACHE = CodeCache()
+
+
+# === Backends ===
+# Compound expressions are transpyled to Python source code by default,
+# which must be parsed again when compiling it. The ``pyast`` backend
+# instead builds the syntax tree for ``compile`` directly. The ``bytecode``
+# backend does not compile at all, which is fastest for small expressions.
+# It also evaluates expressions that are nested too deeply to compile.
+
+
+@attr.s(auto_attribs=True)
+class Backend:
+    """Process-wide selection how compound expressions are transpyled"""
+
+    #: whether to build ``ast`` trees, via ``pyast``, instead of source code
+    tree: bool = False
+    #: largest number of subexpressions to evaluate via ``bytecode``, if any
+    vm_size: int = 0
+
+
+#: the backend used to transpyle all compound expressions
+BACKEND = Backend()
+
+#: deepest nesting of expressions to compile, deeper ones are run as ``bytecode``
+# Python before 3.9 rejects source code nested about 100 parentheses deep
+MAX_NESTING = 80
+
+
 @attr.s(frozen=True, auto_attribs=True)
 class Transpylation(Generic[E, T]):
     """An expression transpiled to Python code"""
@@ -101,13 +290,61 @@ class Transpylation(Generic[E, T]):
     _code: Optional[Any] = attr.ib(init=False, default=None)
 
     def evaluate(self, namespace: "Mapping[Identifier, Expression]") -> T:
-        assert self.parent.names.bound.keys().isdisjoint(namespace)
+        bound = self.parent.names.bound
+        # check only the (few) bound names, not the (many) names of the namespace
+        assert not any(name in namespace for name in bound)
         if self._code is None:
             object.__setattr__(self, "_code", self.__compile())
-        return eval(self._code, {"__namespace__": namespace, **self.parent.names.bound})
+        globals = {"__namespace__": namespace, **bound}
+        if PROFILE.enabled:
+            return profile_call("eval", eval, self._code, globals)
+        return eval(self._code, globals)
 
     def __compile(self) -> Callable[..., T]:
-        return compile(self.source, self.source, "eval", dont_inherit=True)
+        return CODE_CACHE.compile(self.source)
+
+
+# === Interning ===
+# Expressions are immutable, so structurally equal expressions are
+# interchangeable. Interned expression types share a single object
+# for all equal expressions; this saves memory for large programs and
+# allows comparing expressions by identity.
+#
+# For example, parsing ``(a * 3) + (a * 3)`` creates one expression
+# for ``a * 3`` that is used twice, instead of two separate expressions.
+
+#: all interned expressions, by their type and ``attrs`` init fields
+_INTERNED: "weakref.WeakValueDictionary[tuple, Any]" = weakref.WeakValueDictionary()
+
+
+class Interned(type(Protocol)):
+    """
+    Metaclass to share one instance between all structurally equal instances
+
+    Instantiating an interned ``attrs`` class provides the existing instance
+    with equal init fields if there is any. Interned classes should compare and
+    hash by identity (``eq=False``) and fields must be hashable.
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        # pickle via the constructor, so that unpickled instances are interned
+        namespace.setdefault("__reduce__", _reduce_interned)
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+    def __call__(cls, *args, **kwargs):
+        instance = super().__call__(*args, **kwargs)
+        key = (cls, *(getattr(instance, name) for name in _init_fields(cls)))
+        return _INTERNED.setdefault(key, instance)
+
+
+@lru_cache(maxsize=None)
+def _init_fields(cls: type) -> Tuple[str, ...]:
+    return tuple(field.name for field in attr.fields(cls) if field.init)
+
+
+def _reduce_interned(self):
+    cls = type(self)
+    return cls, tuple(getattr(self, name) for name in _init_fields(cls))
 
 
 # === Primitive and Compound Expressions ===
@@ -125,20 +362,295 @@ class Transpylation(Generic[E, T]):
 # but transpile it to ``Fraction(1312, 100)``.
 
 
-@attr.s(frozen=True, auto_attribs=True)
-class CompoundExpression(Expression[T]):
-    children: Tuple[Expression, ...]
+@attr.s(frozen=True, auto_attribs=True, slots=True, eq=False)
+class CompoundExpression(Expression[T], metaclass=Interned):
+    children: Tuple[Expression, ...] = attr.ib(converter=tuple)
     _names: Optional[Names] = attr.ib(init=False, default=None)
+    _source: Optional[str] = attr.ib(init=False, default=None)
 
     @property
     def names(self) -> Names:
+        if self._names is None:
+            # fill in the names of children first, so that no names are
+            # computed recursively even for very deep expressions
+            for expression in post_order(
+                self, descend=lambda compound: compound._names is None
+            ):
+                if isinstance(expression, CompoundExpression):
+                    expression._compute_names()
+        return self._names
+
+    def _compute_names(self):
         if self._names is None:
             object.__setattr__(
-                self,
-                "_names",
-                Names(
-                    free=set.union(*(child.names.free for child in self.children)),
-                    bound=ChainMap(*(child.names.bound for child in self.children)),
-                ),
+                self, "_names", merge_names([child.names for child in self.children])
             )
-        return self._names
+
+    def specialize(self, namespace: "Mapping[Identifier, Expression]"):
+        specialized: Dict[Expression, Expression] = {}
+        for expression in post_order(self):
+            if isinstance(expression, CompoundExpression):
+                specialized[expression] = expression.combine(
+                    *(specialized[child] for child in expression.children)
+                )
+            else:
+                specialized[expression] = expression.specialize(namespace)
+        return specialized[self]
+
+    def combine(self, *children: Expression) -> Expression:
+        """Create the specialized expression from the specialized ``children``"""
+        raise NotImplementedError
+
+    def value_type(self, types: "Mapping[Identifier, ValueType]") -> ValueType:
+        return infer_types(self, types)[self]
+
+    def combine_types(self, *child_types: ValueType) -> ValueType:
+        """The type of the value given the types of the values of its children"""
+        return ValueType.ANY
+
+    def fragments(self, *child_types: ValueType) -> Tuple[str, ...]:
+        """
+        Python code for this expression around the code of its children
+
+        The code of the expression is the first fragment, the code of the first
+        child, the second fragment, and so on, ending with the last fragment.
+        The fragments may depend on the ``child_types``, which are ``ANY`` if
+        omitted.
+        """
+        raise NotImplementedError
+
+    def compose(self, *sources: str) -> str:
+        """Create Python code for this expression from the code of its children"""
+        fragments = self.fragments()
+        parts = [fragments[0]]
+        for source, fragment in zip(sources, fragments[1:]):
+            parts.append(source)
+            parts.append(fragment)
+        return "".join(parts)
+
+    def transpyle(
+        self,
+        types: "Mapping[Identifier, ValueType]" = {},
+        backend: Optional[Backend] = None,
+    ):
+        """
+        Create appropriate Python code for this expression
+
+        The code is specialized to the ``types`` of the free names, if known.
+        The ``backend`` defaults to the process-wide ``BACKEND``.
+        """
+        if backend is None:
+            backend = BACKEND
+        # only the known types of free names affect the code
+        free_types = (
+            tuple(
+                sorted(
+                    (name, types[name])
+                    for name in self.names.free
+                    if types.get(name, ValueType.ANY) is not ValueType.ANY
+                )
+            )
+            if types
+            else ()
+        )
+        if backend.vm_size:
+            bytecode = _bytecode().assemble(self, free_types, backend.vm_size)
+            if bytecode is not None:
+                return bytecode
+        if _nesting(self) > MAX_NESTING:
+            # compiled code is limited in depth, but the bytecode is not
+            return _bytecode().assemble(self, free_types)
+        if backend.tree:
+            from .pyast import TreeTranspylation
+
+            return TreeTranspylation(self, free_types)
+        if free_types:
+            return Transpylation(self, _typed_source(self, free_types))
+        if self._source is None:
+            object.__setattr__(self, "_source", transpyle_shared(self))
+        return Transpylation(self, self._source)
+
+
+@lru_cache(maxsize=None)
+def _bytecode():
+    # the backend depends on this module, so import it on first use
+    from . import bytecode
+
+    return bytecode
+
+
+@lru_cache(maxsize=1024)
+def _nesting(root: CompoundExpression) -> int:
+    """Upper bound for the nesting of parentheses in the code of ``root``"""
+    depths: Dict[Expression, int] = {}
+    for expression in post_order(root):
+        depths[expression] = 1 + max(
+            (depths[child] for child in getattr(expression, "children", ())),
+            default=0,
+        )
+    # every shared subexpression wraps the code in another ``lambda`` call
+    return depths[root] + len(shared_subexpressions(root))
+
+
+@lru_cache(maxsize=1024)
+def _typed_source(
+    root: CompoundExpression, free_types: Tuple[Tuple[Identifier, ValueType], ...]
+) -> str:
+    return transpyle_shared(root, dict(free_types))
+
+
+def post_order(
+    root: Expression, descend: Callable[[CompoundExpression], bool] = lambda _: True
+) -> Iterator[Expression]:
+    """
+    Iterate over all distinct subexpressions of ``root``, children before parents
+
+    Children of a compound expression are only visited if ``descend(compound)``
+    is true. The traversal uses an explicit stack instead of recursion, so it
+    works for expressions of any depth.
+    """
+    seen: Set[int] = set()
+    stack: List[Tuple[Expression, bool]] = [(root, False)]
+    while stack:
+        expression, expanded = stack.pop()
+        if expanded:
+            yield expression
+        elif id(expression) not in seen:
+            seen.add(id(expression))
+            stack.append((expression, True))
+            if isinstance(expression, CompoundExpression) and descend(expression):
+                stack.extend((child, False) for child in reversed(expression.children))
+
+
+def infer_types(
+    root: Expression, types: "Mapping[Identifier, ValueType]" = {}
+) -> Dict[Expression, ValueType]:
+    """Infer the type of ``root`` and all its subexpressions given the ``types`` of names"""
+    inferred: Dict[Expression, ValueType] = {}
+    for expression in post_order(root):
+        if isinstance(expression, CompoundExpression):
+            inferred[expression] = expression.combine_types(
+                *(inferred[child] for child in expression.children)
+            )
+        else:
+            inferred[expression] = expression.value_type(types)
+    return inferred
+
+
+def reference_types(
+    root: Expression, namespace: "Mapping[Identifier, Expression]"
+) -> Dict[Identifier, ValueType]:
+    """
+    Infer the types of the free names of ``root`` from their expressions in ``namespace``
+
+    Names that cannot be looked up in ``namespace`` have no static type. This
+    includes names whose expression depends on the name itself.
+    """
+    types: Dict[Identifier, ValueType] = {}
+    # names are typed once their dependencies are typed, using an explicit
+    # stack so that long chains of names work as well
+    stack: List[Tuple[Identifier, Optional[Expression]]] = [
+        (name, None) for name in reversed(tuple(root.names.free))
+    ]
+    while stack:
+        name, expression = stack.pop()
+        if expression is not None:
+            types[name] = expression.value_type(types)
+        elif name not in types:
+            # names are untyped until inferred, which cuts cyclic references
+            types[name] = ValueType.ANY
+            try:
+                expression = namespace[name]
+            except (KeyError, ArithmeticError, EvaluationError):
+                continue
+            stack.append((name, expression))
+            stack.extend(
+                (dependency, None)
+                for dependency in reversed(tuple(expression.names.free))
+            )
+    return types
+
+
+# === Common Subexpression Elimination ===
+# Expressions may contain the same subexpression several times. Instead
+# of transpyling each occurrence, shared subexpressions are computed
+# once and passed to the rest of the computation as a temporary name.
+#
+# For example, ``((a * b) + (a * b))`` is transpyled as if it were
+# ``(lambda t: t + t)(a * b)``. Note that lambdas instead of assignment
+# expressions are used to support Python versions before 3.8.
+
+
+def shared_subexpressions(root: Expression) -> Set[Expression]:
+    """
+    The subexpressions of ``root`` that are needed more than once
+
+    Literals, i.e. primitives without free names, are as cheap to compute
+    again as to pass around, so they are never shared. In contrast, names
+    must be looked up and evaluated. The ``root`` itself is needed only once.
+    """
+    # an expression that is needed several times only needs its children
+    # once, so don't count them again
+    seen: Set[Expression] = set()
+    shared: Set[Expression] = set()
+    stack: List[Expression] = [root]
+    while stack:
+        expression = stack.pop()
+        compound = isinstance(expression, CompoundExpression)
+        if not compound and not expression.names.free:
+            continue
+        if expression in seen:
+            shared.add(expression)
+        else:
+            seen.add(expression)
+            if compound:
+                stack.extend(expression.children)
+    return shared
+
+
+def transpyle_shared(
+    root: CompoundExpression, types: "Mapping[Identifier, ValueType]" = {}
+) -> str:
+    """Create Python code for ``root``, computing equal subexpressions only once"""
+    inferred = infer_types(root, types)
+    shared = shared_subexpressions(root)
+    # temporaries are defined before any temporaries that depend on them
+    temporaries: Dict[Expression, str] = {
+        expression: f"__cse{index}__"
+        for index, expression in enumerate(
+            expression for expression in post_order(root) if expression in shared
+        )
+    }
+    parts: List[str] = [f"(lambda {name}: " for name in temporaries.values()]
+    _write_source(root, temporaries, inferred, parts)
+    for expression, name in reversed(list(temporaries.items())):
+        parts.append(")(")
+        _write_source(expression, temporaries, inferred, parts)
+        parts.append(")")
+    return "".join(parts)
+
+
+def _write_source(
+    root: Expression,
+    temporaries: Dict[Expression, str],
+    types: Dict[Expression, ValueType],
+    parts: List[str],
+):
+    """Append the code of ``root`` to ``parts``, using names of ``temporaries``"""
+    stack: List[Union[str, Expression]] = [root]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            parts.append(item)
+        elif item is not root and item in temporaries:
+            parts.append(temporaries[item])
+        elif isinstance(item, CompoundExpression):
+            fragments = item.fragments(*(types[child] for child in item.children))
+            stack.append(fragments[-1])
+            for child, fragment in zip(
+                reversed(item.children), reversed(fragments[:-1])
+            ):
+                stack.append(child)
+                stack.append(fragment)
+        else:
+            parts.append(item.transpyle().source)
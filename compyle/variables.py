@@ -1,9 +1,18 @@
-from typing import Mapping, Set, Type
+from typing import Mapping, Set, Type, Optional
 from functools import singledispatch
 
 import attr
 
-from .transpyle import Expression, Identifier, Names, T, Transpylation, CompylationError
+from .transpyle import (
+    Expression,
+    Identifier,
+    Names,
+    T,
+    Transpylation,
+    CompylationError,
+    Interned,
+    ValueType,
+)
 
 
 #: set of all Expression types that are primitive values
@@ -16,15 +25,18 @@ def value_expression(value: T) -> Expression[T]:
     raise CompylationError(f"no expression conversion for {value_expression!r}")
 
 
-@attr.s(frozen=True, auto_attribs=True)
-class Reference(Expression[T]):
+@attr.s(frozen=True, auto_attribs=True, slots=True, eq=False)
+class Reference(Expression[T], metaclass=Interned):
     """A reference to some variable"""
 
     identifier: Identifier
+    _names: Optional[Names] = attr.ib(init=False, default=None)
 
     @property
     def names(self) -> Names:
-        return Names(free={self.identifier})
+        if self._names is None:
+            object.__setattr__(self, "_names", Names(free={self.identifier}))
+        return self._names
 
     def specialize(self, namespace: Mapping[Identifier, Expression]):
         try:
@@ -33,6 +45,9 @@ class Reference(Expression[T]):
             return self
         return replacement.specialize(namespace)
 
+    def value_type(self, types: Mapping[Identifier, ValueType]) -> ValueType:
+        return types.get(self.identifier, ValueType.ANY)
+
     def transpyle(self):
         return Transpylation(
             self, f"__namespace__[{self.identifier!r}].evaluate(__namespace__)"
@@ -0,0 +1,280 @@
+"""
+Vectorized evaluation backend using NumPy
+
+Instead of evaluating an expression once per set of values, the vectorized
+backend evaluates an expression for entire arrays of values at once. Free names
+are bound to arrays (or scalars) which are broadcast against each other; the
+result contains the value of the expression for each element.
+
+All values are represented by a ``Column`` of integer numerators and,
+for fractions, denominators. Columns use ``int64`` arrays as long as this is
+safe and switch to ``object`` arrays of Python integers when an operation might
+overflow. Whether a result is an integer or fraction is known without looking at
+the values, and follows the same rules as scalar evaluation: integers are
+closed under ``+``, ``-`` and ``*``, but ``/`` and fractions produce fractions.
+
+This module requires ``numpy``, which is an optional dependency of ``compyle``.
+"""
+from typing import Mapping, Any, Optional, Dict, Iterable, List, Tuple
+from functools import singledispatch
+import numbers
+
+import attr
+import numpy as np
+
+from .transpyle import Expression, Identifier, CompylationError
+from .variables import Reference
+from .numbers import Integer, Fraction, PyInteger, PyRational
+from .operators import OperatorBinary
+from .interpret import resolution_order
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+@attr.s(frozen=True, auto_attribs=True, eq=False)
+class Column:
+    """Values of an expression for each element of the bindings"""
+
+    #: numerators of all values
+    numerator: np.ndarray
+    #: denominators of all values, or ``None`` for integers
+    denominator: Optional[np.ndarray] = None
+
+    @property
+    def is_integer(self) -> bool:
+        return self.denominator is None
+
+    @property
+    def shape(self):
+        return self.numerator.shape
+
+    def values(self) -> List[Any]:
+        """The values as a flat list of Python integers and fractions"""
+        numerators = self.numerator.ravel().tolist()
+        if self.denominator is None:
+            return [PyInteger(numerator) for numerator in numerators]
+        return [
+            PyRational(numerator, denominator)
+            for numerator, denominator in zip(
+                numerators,
+                np.broadcast_to(self.denominator, self.shape).ravel().tolist(),
+            )
+        ]
+
+    def broadcast(self, shape) -> "Column":
+        """Create a new column broadcast to ``shape``"""
+        return Column(
+            numerator=np.broadcast_to(self.numerator, shape),
+            denominator=None
+            if self.denominator is None
+            else np.broadcast_to(self.denominator, shape),
+        )
+
+
+def as_column(data) -> Column:
+    """Convert an array-like of integers and/or fractions to a column"""
+    if isinstance(data, Column):
+        return data
+    array = np.asarray(data)
+    if array.dtype.kind == "i":
+        return Column(numerator=array.astype(np.int64, copy=False))
+    if array.dtype.kind == "u":
+        return Column(numerator=array.astype(object))
+    if array.dtype.kind == "O":
+        values = array.ravel().tolist()
+        if all(isinstance(value, numbers.Integral) for value in values):
+            return Column(numerator=np.array(values, dtype=object).reshape(array.shape))
+        if all(isinstance(value, numbers.Rational) for value in values):
+            numerators = [value.numerator for value in values]
+            denominators = [value.denominator for value in values]
+            return Column(
+                numerator=np.array(numerators, dtype=object).reshape(array.shape),
+                denominator=np.array(denominators, dtype=object).reshape(array.shape),
+            )
+    raise CompylationError(f"cannot convert {array.dtype} data to a column")
+
+
+class VectorNamespace:
+    """Columns of all names available for vectorized evaluation"""
+
+    def __init__(
+        self,
+        bindings: Mapping[Identifier, Any],
+        namespace: Mapping[Identifier, Expression],
+    ):
+        self._columns: Dict[Identifier, Column] = {
+            name: as_column(data) for name, data in bindings.items()
+        }
+        self.namespace = namespace
+        #: the shape of all bindings broadcast together
+        self.shape = _broadcast_shape(
+            column.numerator for column in self._columns.values()
+        )
+
+    def resolve(self, identifier: Identifier) -> Column:
+        """
+        Get the column of a name, raising ``KeyError`` if it is not defined
+
+        Names are resolved as by the interpreter: the names it depends on are
+        computed first, and ``CyclicReference`` is raised if the name depends
+        on itself.
+        """
+        try:
+            return self._columns[identifier]
+        except KeyError:
+            pass
+        for name in resolution_order(identifier, self.namespace, self._columns):
+            self._columns[name] = vectorize(self.namespace[name], self)
+        return self._columns[identifier]
+
+
+def _broadcast_shape(arrays: Iterable[np.ndarray]) -> Tuple[int, ...]:
+    """The shape of all ``arrays`` broadcast together"""
+    # ``np.broadcast_shapes`` requires NumPy 1.20, and ``np.broadcast`` takes
+    # only a limited number of arrays at once
+    shape: Tuple[int, ...] = ()
+    for array in arrays:
+        shape = np.broadcast(np.broadcast_to(0, shape), array).shape
+    return shape
+
+
+def evaluate_vectorized(
+    expression: Expression,
+    bindings: Mapping[Identifier, Any],
+    namespace: Mapping[Identifier, Expression] = {},
+) -> Column:
+    """
+    Evaluate ``expression`` for all elements of ``bindings``
+
+    Free names of ``expression`` are looked up in ``bindings`` first, which map
+    names to arrays of values. Names not in ``bindings`` are looked up in
+    ``namespace``, which maps names to expressions. The result is broadcast to
+    the shape of all ``bindings``. If any element divides by zero, the entire
+    evaluation fails with a ``ZeroDivisionError``.
+    """
+    vector_namespace = VectorNamespace(bindings, namespace)
+    return vectorize(expression, vector_namespace).broadcast(vector_namespace.shape)
+
+
+# === Vectorized Expressions ===
+@singledispatch
+def vectorize(expression: Expression, namespace: VectorNamespace) -> Column:
+    """
+    Compute the column of values of ``expression``
+
+    This is a ``singledispatch`` function. Expressions without a registered rule
+    must not have free names; they are evaluated once and used as a scalar.
+    """
+    if expression.names.free:
+        raise CompylationError(f"no vectorization for {expression!r}")
+    return as_column(expression.evaluate({}))
+
+
+@vectorize.register(Integer)
+def vectorize_integer(expression: Integer, namespace: VectorNamespace) -> Column:
+    return as_column(expression.value)
+
+
+@vectorize.register(Fraction)
+def vectorize_fraction(expression: Fraction, namespace: VectorNamespace) -> Column:
+    return as_column(PyRational(expression.numerator, expression.denominator))
+
+
+@vectorize.register(Reference)
+def vectorize_reference(expression: Reference, namespace: VectorNamespace) -> Column:
+    return namespace.resolve(expression.identifier)
+
+
+@vectorize.register(OperatorBinary)
+def vectorize_binary(expression: OperatorBinary, namespace: VectorNamespace) -> Column:
+    lhs, rhs = (vectorize(child, namespace) for child in expression.children)
+    try:
+        operation = COLUMN_OPERATORS[expression.symbol]
+    except KeyError:
+        raise CompylationError(f"no vectorization for operator {expression.symbol!r}")
+    return operation(lhs, rhs)
+
+
+# === Overflow-safe integer array arithmetic ===
+def _magnitude(array: np.ndarray) -> int:
+    """The largest absolute value in ``array``"""
+    if not array.size:
+        return 0
+    return max(abs(int(array.max())), abs(int(array.min())))
+
+
+def _promote(lhs: np.ndarray, rhs: np.ndarray, magnitude: int):
+    """Convert both arrays to ``object`` if results may reach ``magnitude``"""
+    if lhs.dtype == object or rhs.dtype == object or magnitude > _INT64_MAX:
+        return lhs.astype(object, copy=False), rhs.astype(object, copy=False)
+    return lhs, rhs
+
+
+def _add(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    lhs, rhs = _promote(lhs, rhs, _magnitude(lhs) + _magnitude(rhs))
+    return np.asarray(lhs + rhs)
+
+
+def _sub(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    lhs, rhs = _promote(lhs, rhs, _magnitude(lhs) + _magnitude(rhs))
+    return np.asarray(lhs - rhs)
+
+
+def _mul(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    lhs, rhs = _promote(lhs, rhs, _magnitude(lhs) * _magnitude(rhs))
+    return np.asarray(lhs * rhs)
+
+
+def _fraction(numerator: np.ndarray, denominator: np.ndarray) -> Column:
+    """Create a normalized fraction column with positive denominators"""
+    if np.any(denominator == 0):
+        raise ZeroDivisionError("division by zero")
+    numerator = _mul(numerator, np.sign(denominator))
+    denominator = _mul(denominator, np.sign(denominator))
+    numerator, denominator = _promote(numerator, denominator, 0)
+    divisor = np.gcd(numerator, denominator)
+    return Column(
+        numerator=np.asarray(numerator // divisor),
+        denominator=np.asarray(denominator // divisor),
+    )
+
+
+def _terms(column: Column):
+    if column.denominator is None:
+        return column.numerator, np.ones((), dtype=column.numerator.dtype)
+    return column.numerator, column.denominator
+
+
+def column_add(lhs: Column, rhs: Column) -> Column:
+    if lhs.is_integer and rhs.is_integer:
+        return Column(numerator=_add(lhs.numerator, rhs.numerator))
+    (ln, ld), (rn, rd) = _terms(lhs), _terms(rhs)
+    return _fraction(_add(_mul(ln, rd), _mul(rn, ld)), _mul(ld, rd))
+
+
+def column_sub(lhs: Column, rhs: Column) -> Column:
+    if lhs.is_integer and rhs.is_integer:
+        return Column(numerator=_sub(lhs.numerator, rhs.numerator))
+    (ln, ld), (rn, rd) = _terms(lhs), _terms(rhs)
+    return _fraction(_sub(_mul(ln, rd), _mul(rn, ld)), _mul(ld, rd))
+
+
+def column_mul(lhs: Column, rhs: Column) -> Column:
+    if lhs.is_integer and rhs.is_integer:
+        return Column(numerator=_mul(lhs.numerator, rhs.numerator))
+    (ln, ld), (rn, rd) = _terms(lhs), _terms(rhs)
+    return _fraction(_mul(ln, rn), _mul(ld, rd))
+
+
+def column_truediv(lhs: Column, rhs: Column) -> Column:
+    (ln, ld), (rn, rd) = _terms(lhs), _terms(rhs)
+    return _fraction(_mul(ln, rd), _mul(ld, rn))
+
+
+#: implementation of each operator symbol for columns
+COLUMN_OPERATORS = {
+    "+": column_add,
+    "-": column_sub,
+    "*": column_mul,
+    "/": column_truediv,
+}
@@ -0,0 +1,132 @@
+"""
+Re-running a *Toy Language Program* file whenever it changes
+
+A watched program keeps the parsed statement, the namespace before it and
+the result of every line of the file. When the file changes, only lines whose
+text changed are parsed again, and the program is only run again from the
+first changed line onward; earlier lines keep their results and the namespace
+before the first changed line is reused as is.
+
+For example, watching a file and appending ``>>> a * 2`` to it::
+
+    $ python3 -m compyle --watch program.toy
+    3
+    # program.toy: re-run from line 3
+    6
+
+Errors do not stop the program; like for the ``server``, they are reported as
+the result of their line.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Union, TextIO
+import os
+import sys
+import time
+
+import pyparsing as pp
+
+from .frontend import parse_statement
+from .interpret import Assign, Evaluate, Failure, eval_assign, eval_evaluate
+from .namespace import Namespace
+from .transpyle import EvaluationError
+
+#: result of lines which do not produce any output
+_NO_RESULT = object()
+
+
+class WatchedProgram:
+    """The results of a program, which are updated for changes of its lines"""
+
+    def __init__(self):
+        self._lines: List[str] = []
+        #: parsed statements or syntax errors, by their stripped line
+        self._parsed: Dict[str, Union[Assign, Evaluate, Failure]] = {}
+        #: the namespace before each line, plus the namespace after all lines
+        self._namespaces: List[Namespace] = [Namespace()]
+        self._results: List[Any] = []
+
+    def update(self, lines: Iterable[str]) -> int:
+        """Update the program to ``lines``, returning the index of the first change"""
+        lines = [line.strip() for line in lines]
+        start = 0
+        for start, (old, new) in enumerate(zip(self._lines, lines)):
+            if old != new:
+                break
+        else:
+            start = min(len(self._lines), len(lines))
+        parsed = {line: self._parse(line) for line in lines if line}
+        self._lines, self._parsed = lines, parsed
+        del self._namespaces[start + 1 :], self._results[start:]
+        namespace = self._namespaces[start]
+        for line in lines[start:]:
+            namespace, result = self._run(parsed.get(line), namespace)
+            self._namespaces.append(namespace)
+            self._results.append(result)
+        return start
+
+    def _parse(self, line: str) -> Union[Assign, Evaluate, Failure]:
+        try:
+            return self._parsed[line]
+        except KeyError:
+            pass
+        try:
+            return parse_statement(line)
+        except pp.ParseBaseException as err:
+            return Failure(f"SyntaxError: {err}")
+
+    @staticmethod
+    def _run(statement: Union[Assign, Evaluate, Failure, None], namespace: Namespace):
+        if statement is None:
+            return namespace, _NO_RESULT
+        if type(statement) is Failure:
+            return namespace, statement
+        try:
+            if type(statement) is Assign:
+                return eval_assign(statement, namespace), _NO_RESULT
+            return namespace, eval_evaluate(statement, namespace)
+        except (Exception, EvaluationError) as err:
+            return namespace, Failure(f"{type(err).__name__}: {err}")
+
+    def results(self, start: int = 0) -> List[Any]:
+        """The results of all lines from the index ``start`` onward"""
+        return [result for result in self._results[start:] if result is not _NO_RESULT]
+
+
+class FileWatcher:
+    """Watcher of the program at ``path``, writing new results to ``output``"""
+
+    def __init__(self, path: str, output: TextIO):
+        self.path = path
+        self.output = output
+        self.program = WatchedProgram()
+        self._signature = None
+
+    def check(self) -> bool:
+        """Run the program again if the file changed, and report if it did"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._signature:
+            return False
+        rerun = self._signature is not None
+        self._signature = stat.st_mtime_ns, stat.st_size
+        with open(self.path) as in_stream:
+            lines = in_stream.read().splitlines()
+        start = self.program.update(lines)
+        if rerun and start < len(lines):
+            print(f"# {self.path}: re-run from line {start + 1}", file=self.output)
+        for result in self.program.results(start):
+            print(result, file=self.output)
+        self.output.flush()
+        return True
+
+
+def watch(path: str, interval: float = 0.25, output: Optional[TextIO] = None):
+    """Run the program at ``path`` whenever it changes, until interrupted"""
+    watcher = FileWatcher(path, output if output is not None else sys.stdout)
+    try:
+        while True:
+            watcher.check()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
@@ -19,6 +19,7 @@ setuptools.setup(
     ],
     install_requires=["pyparsing", "attrs", "typing_extensions"],
     extras_require={
-        'test': ["pytest", "black; implementation_name=='cpython'"],
+        'numpy': ["numpy"],
+        'test': ["pytest", "numpy", "black; implementation_name=='cpython'"],
     },
 )
@@ -0,0 +1,68 @@
+import builtins
+import os
+
+from compyle.artifacts import Artifact, ArtifactCache
+from compyle.transpyle import CodeCache
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+
+from .test_program import PROGRAMS
+
+
+def test_artifact_roundtrip():
+    for source in PROGRAMS:
+        instructions = list(parse_source(source))
+        code = {"1 + 2": compile("1 + 2", "1 + 2", "eval")}
+        artifact = Artifact.loads(
+            Artifact(instructions=instructions, code=code).dumps()
+        )
+        assert artifact.instructions == instructions
+        assert list(eval(artifact.instructions)) == list(eval(instructions))
+        assert builtins.eval(artifact.code["1 + 2"]) == 3
+
+
+def test_cache_keys(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    program = tmp_path / "program.toy"
+    program.write_text("a := 3\n>>> a\n")
+    key = cache.key([str(program)])
+    assert key == cache.key([str(program)])
+    assert key != cache.key([str(program), ">>> 1"])
+    program.write_text("a := 4\n>>> a\n")
+    assert key != cache.key([str(program)])
+
+
+def test_cache_load_store(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    assert cache.load("missing") is None
+    artifact = Artifact(instructions=list(parse_source([">>> 1"])), code={})
+    cache.store("valid", artifact)
+    assert cache.load("valid") == artifact
+    (tmp_path / "corrupt.artifact").write_bytes(b"garbage")
+    assert cache.load("corrupt") is None
+    assert not (tmp_path / "corrupt.artifact").exists()
+
+
+def test_cache_eviction(tmp_path):
+    artifact = Artifact(instructions=list(parse_source([">>> 1"] * 100)), code={})
+    size = len(artifact.dumps())
+    cache = ArtifactCache(str(tmp_path), max_size=3 * size)
+    for index in range(3):
+        cache.store(f"a{index}", artifact)
+        os.utime(tmp_path / f"a{index}.artifact", (index, index))
+    cache.load("a0")
+    cache.store("a3", artifact)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "a0.artifact",
+        "a2.artifact",
+        "a3.artifact",
+    ]
+
+
+def test_code_cache_update():
+    cache = CodeCache(maxsize=2)
+    code = compile("1", "1", "eval")
+    cache.update({"1": code, "2": compile("2", "2", "eval")})
+    assert cache.compile("1") is code
+    assert cache.misses == 0
+    assert set(cache.entries()) == {"1", "2"}
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+import attr
+import pytest
+
+from compyle.bench import measure, compare, PHASES, measure_startup, STARTUP_BUDGET
+from compyle.bench.generators import GENERATORS, identifier
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+
+
+def test_identifier():
+    names = [identifier(index) for index in range(2000)]
+    assert len(set(names)) == len(names)
+    assert all(name.isalpha() for name in names)
+
+
+@pytest.mark.parametrize("program", sorted(GENERATORS))
+def test_generators(program):
+    for result in eval(parse_source(GENERATORS[program](150))):
+        assert not isinstance(result, str)
+
+
+@pytest.mark.parametrize("phase", list(PHASES))
+def test_measure(phase):
+    result = measure("distinct_names", phase, size=10, repeat=1)
+    assert result.statements == 10
+    assert result.throughput > 0
+    baseline = {
+        ("distinct_names", phase): attr.evolve(result, seconds=result.seconds * 2)
+    }
+    assert compare([result], baseline) == {("distinct_names", phase): 0.5}
+
+
+def test_compare_sizes():
+    result = measure("distinct_names", "parse", size=10, repeat=1)
+    # the same time per statement is no slowdown, regardless of the size
+    baseline = {
+        ("distinct_names", "parse"): attr.evolve(
+            result, statements=20, seconds=result.seconds * 2
+        )
+    }
+    assert compare([result], baseline) == pytest.approx(
+        {("distinct_names", "parse"): 1}
+    )
+
+
+#: allowed excess over ``STARTUP_BUDGET`` for noise from running alongside the tests
+STARTUP_TOLERANCE = 1.2
+
+
+def test_startup():
+    assert measure_startup(repeat=3) < STARTUP_BUDGET * STARTUP_TOLERANCE
+
+
+def test_lazy_imports():
+    # running a valid statement must neither need pyparsing nor process pools
+    script = (
+        "import runpy, sys;"
+        "sys.argv = ['compyle', '>>> 1'];"
+        "runpy.run_module('compyle', run_name='__main__');"
+        "print(sorted({'pyparsing', 'concurrent.futures.process'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, stdout=subprocess.PIPE
+    ).stdout
+    assert output.decode().splitlines() == ["1", "[]"]
@@ -0,0 +1,66 @@
+import pytest
+
+from compyle.transpyle import BACKEND, Backend
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+from compyle.numbers import Integer, Fraction
+from compyle.operators import OperatorBinary
+from compyle.variables import Reference
+from compyle.bytecode import Bytecode, LOAD_NAME, STORE_TEMP, LOAD_TEMP
+
+from .test_program import PROGRAMS
+
+#: evaluate every expression with the VM
+VM = Backend(vm_size=1_000_000)
+
+
+@pytest.fixture
+def vm_size():
+    original = BACKEND.vm_size
+    try:
+        yield
+    finally:
+        BACKEND.vm_size = original
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_vm_differential(source, vm_size):
+    BACKEND.vm_size = 0
+    expected = list(eval(parse_source(source)))
+    BACKEND.vm_size = VM.vm_size
+    assert list(eval(parse_source(source))) == expected
+
+
+def test_vm_shared():
+    product = OperatorBinary(symbol="*", children=(Reference("a"), Fraction(1, 2)))
+    expression = OperatorBinary(
+        symbol="/",
+        children=(OperatorBinary(symbol="+", children=(product, product)), Integer(3)),
+    )
+    bytecode = expression.transpyle(backend=VM)
+    assert type(bytecode) is Bytecode
+    # the shared product is computed only once
+    assert list(bytecode.opcodes).count(LOAD_NAME) == 1
+    assert list(bytecode.opcodes).count(STORE_TEMP) == 1
+    assert list(bytecode.opcodes).count(LOAD_TEMP) == 1
+    assert bytecode.evaluate({"a": Integer(3)}) == 1
+    assert "MULTIPLY" in bytecode.source
+    expected = expression.transpyle(backend=Backend(vm_size=0))
+    assert bytecode.evaluate({"a": Integer(5)}) == expected.evaluate({"a": Integer(5)})
+
+
+def test_vm_errors():
+    expression = OperatorBinary(symbol="/", children=(Reference("a"), Reference("b")))
+    bytecode = expression.transpyle(backend=VM)
+    with pytest.raises(ZeroDivisionError):
+        bytecode.evaluate({"a": Integer(1), "b": Integer(0)})
+    with pytest.raises(KeyError):
+        bytecode.evaluate({"a": Integer(1)})
+
+
+def test_vm_size():
+    expression = Reference("a")
+    for _ in range(8):
+        expression = OperatorBinary(symbol="+", children=(expression, Integer(1)))
+    assert type(expression.transpyle(backend=Backend(vm_size=16))) is Bytecode
+    assert type(expression.transpyle(backend=Backend(vm_size=8))) is not Bytecode
@@ -0,0 +1,28 @@
+import json
+
+from compyle._debug import PROFILE, ENABLED_CHANNELS, DEBUG_CHANNEL
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+
+
+def test_profile():
+    source = ["a := 3", "b := (a * 2) + 1", ">>> b * a", ">>> c"]
+    calls = dict(PROFILE.calls)
+    PROFILE.enable()
+    try:
+        assert list(eval(parse_source(source))) == [
+            21,
+            "NameError: name 'c' is not defined",
+        ]
+    finally:
+        PROFILE.enabled = False
+        ENABLED_CHANNELS.discard(DEBUG_CHANNEL.PROFILE)
+    report = json.loads(json.dumps(PROFILE.report()))
+    for phase in ("parse", "specialize", "transpyle", "eval"):
+        assert report["phases"][phase]["calls"] > calls.get(phase, 0)
+    assert report["statistics"]["namespace_size"]["max"] >= 2
+    assert report["statistics"]["expression_nodes"]["max"] >= 5
+    # disabled profiling does not record anything
+    calls = dict(PROFILE.calls)
+    list(eval(parse_source(source)))
+    assert dict(PROFILE.calls) == calls
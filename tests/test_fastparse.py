@@ -0,0 +1,90 @@
+import random
+
+import pyparsing as pp
+import pytest
+
+from compyle.fastparse import parse_line, ParseError
+from compyle.parser import grammar, unparse
+from compyle.numbers import Integer, Fraction
+from compyle.operators import OperatorBinary
+from compyle.variables import Reference
+from compyle.interpret import Assign, Evaluate
+
+from .test_examples import EXPRESSIONS
+
+VALID = [f">>> {expression}" for expression, _ in EXPRESSIONS] + [
+    ">>> 3 # Hello World",
+    ">>>3#Hello World",
+    ">>> (a / 2:3) * (4 * 12)",
+    ">>> ((1 + 2) * (3 - -4)) / +5",
+    ">>> a-4",
+    ">>> 3 -4",
+    ">>> 3 : -4",
+    ">>> Kevin",
+    "foo := 12 + bar",
+    "foo_bar:=(foo-12.5)",
+    "a := 3 # assign",
+]
+INVALID = [
+    ">>> (3)",
+    ">>> 1 + 2 + 3",
+    ">>> 3 +",
+    ">>> 3 4",
+    ">>> +1.5",
+    ">>> 1.",
+    ">>> 1.5:2",
+    ">>> - 3",
+    ">>> -a",
+    ">>> a1",
+    ">>> 3 : = 4",
+    ">>> (1 + 2",
+    "_foo := 3",
+    "foo = 3",
+    "foo :=",
+    "# comment",
+    "3 := 3",
+]
+
+
+def parse_pyparsing(line):
+    return grammar().TOP_LEVEL.parseString(line, parseAll=True)[0]
+
+
+@pytest.mark.parametrize("line", VALID)
+def test_valid(line):
+    assert parse_line(line) == parse_pyparsing(line)
+
+
+@pytest.mark.parametrize("line", INVALID)
+def test_invalid(line):
+    with pytest.raises(pp.ParseBaseException):
+        parse_pyparsing(line)
+    with pytest.raises(ParseError):
+        parse_line(line)
+
+
+def random_expression(rng: random.Random, depth: int):
+    if depth == 0 or rng.random() < 0.2:
+        kind = rng.randrange(3)
+        if kind == 0:
+            return Reference(rng.choice(["a", "foo", "Bar_baz"]))
+        elif kind == 1:
+            return Integer(rng.randint(-1000, 1000))
+        return Fraction(rng.randint(-1000, 1000), rng.randint(1, 1000))
+    return OperatorBinary(
+        symbol=rng.choice("+-*/"),
+        children=(
+            random_expression(rng, depth - 1),
+            random_expression(rng, depth - 1),
+        ),
+    )
+
+
+def test_roundtrip():
+    rng = random.Random(1337)
+    for _ in range(200):
+        expression = random_expression(rng, 6)
+        for statement in (Evaluate(expression), Assign("foo", expression)):
+            source = unparse(statement)
+            assert parse_line(source) == statement
+            assert parse_line(source) == parse_pyparsing(source)
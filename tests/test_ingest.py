@@ -0,0 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from compyle.frontend import parse_source
+from compyle.ingest import parse_file, chunk_boundaries
+
+from .test_program import PROGRAMS
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_chunk_boundaries(tmp_path):
+    path = tmp_path / "program.toy"
+    path.write_bytes(b"a := 1\n\n>>> a\nb := 2")
+    assert chunk_boundaries(str(path), 1) == [(0, 7), (7, 8), (8, 14), (14, 20)]
+    assert chunk_boundaries(str(path), 10) == [(0, 14), (14, 20)]
+    assert chunk_boundaries(str(path), 100) == [(0, 20)]
+    path.write_bytes(b"")
+    assert chunk_boundaries(str(path), 100) == []
+
+
+@pytest.mark.parametrize("chunksize", [1, 16, 1024])
+def test_parse_differential(tmp_path, executor, chunksize):
+    lines = [line for source in PROGRAMS for line in source for _ in range(3)]
+    path = tmp_path / "program.toy"
+    path.write_text("\n".join(lines) + "\n")
+    statements = list(parse_file(str(path), executor, chunksize=chunksize))
+    assert statements == list(parse_source(lines))
+
+
+def test_parse_error_line(tmp_path, executor, capsys):
+    lines = [">>> 1"] * 20 + ["", "a := (1 +"] + [">>> 1"] * 20
+    path = tmp_path / "program.toy"
+    path.write_text("\n".join(lines))
+    with pytest.raises(SystemExit):
+        list(parse_file(str(path), executor, chunksize=32))
+    assert f"{path}:22" in capsys.readouterr().err
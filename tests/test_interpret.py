@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+import sys
+
+import pytest
+
+from compyle.interpret import (
+    eval,
+    eval_incremental,
+    eval_parallel,
+    IncrementalNamespace,
+)
+from compyle.frontend import parse_source
+from compyle.bench.generators import identifier
+from compyle.numbers import Integer
+from compyle.program import eval_compiled
+from compyle.operators import OperatorBinary
+from compyle.variables import Reference
+
+from .test_program import PROGRAMS
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_incremental_differential(source):
+    expected = list(eval(parse_source(source)))
+    assert list(eval_incremental(parse_source(source))) == expected
+
+
+def test_incremental_invalidation():
+    namespace = IncrementalNamespace()
+    namespace.assign("a", Integer(2))
+    namespace.assign("b", OperatorBinary(symbol="*", children=(Reference("a"),) * 2))
+    namespace.assign("c", OperatorBinary(symbol="+", children=(Reference("b"),) * 2))
+    namespace.assign("d", Integer(7))
+    assert namespace["c"].evaluate(namespace) == 8
+    cached_c, cached_d = namespace["c"], namespace["d"]
+    assert namespace["c"] is cached_c
+    namespace.assign("a", Integer(3))
+    assert namespace["d"] is cached_d
+    assert namespace["c"].evaluate(namespace) == 18
+    namespace.assign("b", Reference("d"))
+    assert namespace["c"].evaluate(namespace) == 14
+    namespace.assign("a", Integer(5))
+    assert namespace["c"].evaluate(namespace) == 14
+
+
+def fibonacci_program(length: int):
+    source = ["a := 1", "b := 1"]
+    for index in range(2, length):
+        source.append(
+            f"{identifier(index)} := ({identifier(index - 1)} + {identifier(index - 2)})"
+        )
+    return source + [f">>> {identifier(length - 1)}"]
+
+
+@pytest.mark.parametrize(
+    "evaluator", [eval, eval_incremental, eval_parallel, eval_compiled]
+)
+def test_memoized_references(evaluator):
+    # without memoization, evaluating names takes exponential time
+    results = list(evaluator(parse_source(fibonacci_program(80))))
+    assert results == [23416728348467685]
+
+
+@pytest.mark.parametrize("evaluator", [eval, eval_incremental, eval_compiled])
+def test_long_reference_chains(evaluator):
+    # each name refers to the previous one, far deeper than Python may recurse
+    length = 2 * sys.getrecursionlimit()
+    source = ["a := 0"]
+    for index in range(1, length):
+        source.append(f"{identifier(index)} := ({identifier(index - 1)} + 1)")
+    source += [f">>> {identifier(length - 1)}", f">>> ({identifier(length - 1)} * 2)"]
+    results = list(evaluator(parse_source(source)))
+    assert results == [length - 1, 2 * (length - 1)]
+
+
+@pytest.mark.parametrize("evaluator", [eval, eval_incremental, eval_compiled])
+def test_cyclic_references(evaluator):
+    source = ["a := (b + 1)", "b := (c * 2)", "c := a", ">>> c", ">>> (x + c)"]
+    assert list(evaluator(parse_source(source))) == [
+        "RecursionError: name 'c' refers to itself",
+        "NameError: name 'x' is not defined",
+    ]
+    source = ["a := (a + 1)", ">>> a", "a := 3", ">>> a"]
+    assert list(evaluator(parse_source(source))) == [
+        "RecursionError: name 'a' refers to itself",
+        3,
+    ]
+
+
+def test_parallel_differential():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for source in PROGRAMS:
+            expected = list(eval(parse_source(source)))
+            results = eval_parallel(parse_source(source), executor, chunksize=3)
+            assert list(results) == expected
+
+
+class DeferredExecutor:
+    """Executor that only runs tasks once their result is requested"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.pending = self.max_pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        return DeferredFuture(self, function, args)
+
+
+class DeferredFuture:
+    def __init__(self, executor, function, args):
+        self.executor, self.function, self.args = executor, function, args
+
+    def done(self):
+        return False
+
+    def result(self):
+        self.executor.pending -= 1
+        return self.function(*self.args)
+
+
+def test_parallel_max_workers(monkeypatch):
+    executors = []
+
+    def create_executor(max_workers=None):
+        executors.append(DeferredExecutor(max_workers))
+        return executors[-1]
+
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", create_executor)
+    monkeypatch.setattr("os.cpu_count", lambda: 64)
+    source = [f">>> {index}" for index in range(100)]
+    results = eval_parallel(parse_source(source), chunksize=1, max_workers=1)
+    assert list(results) == list(range(100))
+    (executor,) = executors
+    # in-flight chunks are bounded by the requested workers, not all cores
+    assert executor.max_workers == 1
+    assert executor.max_pending <= 5
@@ -0,0 +1,62 @@
+import pickle
+import random
+
+from compyle.namespace import Namespace
+
+
+class Colliding:
+    """Key type with a fixed hash to force collisions"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and self.name == other.name
+
+    def __repr__(self):
+        return f"Colliding({self.name!r})"
+
+
+def test_snapshots():
+    empty = Namespace()
+    first = empty.set("a", 1)
+    second = first.set("b", 2)
+    third = second.set("a", 3)
+    assert dict(empty) == {}
+    assert dict(first) == {"a": 1}
+    assert dict(second) == {"a": 1, "b": 2}
+    assert dict(third) == {"a": 3, "b": 2}
+    assert len(third) == 2
+    assert "b" in third and "b" not in first
+    assert third.get("c") is None
+
+
+def test_against_dict():
+    rng = random.Random(1337)
+    reference, namespace = {}, Namespace()
+    for _ in range(5000):
+        key, value = rng.randrange(2000), rng.random()
+        reference[key] = value
+        namespace = namespace.set(key, value)
+    assert len(namespace) == len(reference)
+    assert namespace == reference
+    assert Namespace(reference) == namespace
+
+
+def test_collisions():
+    keys = [Colliding(name) for name in "abcde"]
+    namespace = Namespace((key, index) for index, key in enumerate(keys))
+    namespace = namespace.set(keys[2], "replaced").set(-1, "other")
+    assert len(namespace) == 6
+    assert namespace[keys[2]] == "replaced"
+    assert namespace[keys[4]] == 4
+    assert namespace[-1] == "other"
+    assert Colliding("f") not in namespace
+
+
+def test_pickle():
+    namespace = Namespace({"a": 1, "b": 2})
+    assert pickle.loads(pickle.dumps(namespace)) == namespace
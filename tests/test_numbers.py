@@ -0,0 +1,126 @@
+from fractions import Fraction as PyFraction
+import math
+import numbers
+import operator
+import pickle
+import random
+
+import pytest
+
+from compyle.numbers import PyRational, PyInteger, Fraction
+from compyle.variables import value_expression
+
+
+def random_operands(rng: random.Random):
+    numerator = rng.randint(-99, 99)
+    denominator = rng.choice((-1, 1)) * rng.randint(1, 99)
+    return PyRational(numerator, denominator), PyFraction(numerator, denominator)
+
+
+@pytest.mark.parametrize("symbol", ["+", "-", "*", "/", "%"])
+def test_fraction_equivalence(symbol):
+    operation = {
+        "+": operator.add,
+        "-": operator.sub,
+        "*": operator.mul,
+        "/": operator.truediv,
+        "%": operator.mod,
+    }[symbol]
+    rng = random.Random(symbol)
+    for _ in range(200):
+        (lhs, py_lhs), (rhs, py_rhs) = random_operands(rng), random_operands(rng)
+        if symbol in "/%" and not rhs:
+            continue
+        result, expected = operation(lhs, rhs), operation(py_lhs, py_rhs)
+        assert type(result) is PyRational
+        assert result == expected and expected == result
+        assert hash(result) == hash(expected)
+        assert str(result) == str(expected)
+        assert (result.numerator, result.denominator) == (
+            expected.numerator,
+            expected.denominator,
+        )
+        integer = rng.choice((-1, 1)) * rng.randint(1, 20)
+        assert operation(lhs, PyInteger(integer)) == operation(py_lhs, integer)
+        if symbol not in "/%" or lhs:
+            assert operation(PyInteger(integer), lhs) == operation(integer, py_lhs)
+
+
+def test_integer_interop():
+    assert PyInteger(3) / PyInteger(4) == PyFraction(3, 4)
+    assert type(PyInteger(3) / PyInteger(4)) is PyRational
+    assert PyRational(8, 4) == 2 and hash(PyRational(8, 4)) == hash(2)
+    assert str(PyRational(8, 4)) == "2"
+    assert PyRational(1, 3) < PyFraction(1, 2) < PyRational(2, 3)
+    assert PyRational(1, 2) == 0.5
+    with pytest.raises(ZeroDivisionError):
+        PyInteger(1) / PyInteger(0)
+    with pytest.raises(ZeroDivisionError):
+        PyRational(1, 2) / 0
+
+
+def test_deferred_normalization():
+    value = PyRational(1, 2)
+    for _ in range(100):
+        value = value * 3 / 3
+    assert value == PyRational(1, 2)
+    assert repr(value) == "PyRational(1, 2)"
+    assert pickle.loads(pickle.dumps(value)) == value
+
+
+def test_expressions():
+    assert type(Fraction(3, 4).evaluate({})) is PyRational
+    assert Fraction(3, 4).transpyle().evaluate({}) == PyFraction(3, 4)
+    assert value_expression(PyRational(6, 8)) is Fraction(3, 4)
+    assert value_expression(PyFraction(6, 8)) is Fraction(3, 4)
+
+
+def test_rational_protocol():
+    rng = random.Random("rational")
+    for _ in range(200):
+        (value, py_value), (other, py_other) = random_operands(rng), random_operands(
+            rng
+        )
+        assert isinstance(value, numbers.Rational)
+        if other:
+            assert value // other == py_value // py_other
+            assert divmod(value, other) == divmod(py_value, py_other)
+        assert math.trunc(value) == math.trunc(py_value)
+        assert math.floor(value) == math.floor(py_value)
+        assert math.ceil(value) == math.ceil(py_value)
+        assert round(value) == round(py_value)
+        assert round(value, 1) == round(py_value, 1)
+        assert round(value, -1) == round(py_value, -1)
+        exponent = rng.randint(-3, 3)
+        if value or exponent >= 0:
+            assert value**exponent == py_value**exponent
+    assert PyRational(1, 4) ** PyRational(1, 2) == 0.5
+    assert 4 ** PyRational(1, 2) == 2.0
+    assert 2 ** PyRational(-2) == PyFraction(1, 4)
+    # exponents are integral even if their terms are not normalized yet
+    for exponent, py_exponent in [
+        (PyRational(4, 2), PyFraction(4, 2)),
+        (PyRational(-6, 3), PyFraction(-6, 3)),
+    ]:
+        result, expected = PyRational(2) ** exponent, PyFraction(2) ** py_exponent
+        assert type(result) is PyRational and result == expected
+        assert PyRational(2, 3) ** exponent == PyFraction(2, 3) ** py_exponent
+        assert 3**exponent == 3**py_exponent
+
+
+def test_inexact_interop():
+    assert PyRational(1, 2) + 0.5 == 0.5 + PyRational(1, 2) == 1.0
+    assert type(PyRational(1, 2) * 0.5) is float
+    assert 1.5 - PyRational(1, 2) == PyRational(1, 2) - (-0.5) == 1.0
+    assert PyRational(1, 2) / 0.25 == 0.25 / PyRational(1, 8) == 2.0
+    assert PyRational(1, 2) + 1j == 0.5 + 1j
+    assert complex(PyRational(1, 2)) == 0.5
+
+
+def test_constructor_terms():
+    assert PyRational(PyFraction(1, 2), PyRational(3, 4)) == PyFraction(2, 3)
+    assert PyRational(PyRational(3, 2)) == PyFraction(3, 2)
+    with pytest.raises(TypeError):
+        PyRational(0.5)
+    with pytest.raises(TypeError):
+        PyRational(1, "2")
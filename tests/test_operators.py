@@ -0,0 +1,75 @@
+from fractions import Fraction as PyFraction
+import sys
+
+import pytest
+
+from compyle.transpyle import CODE_CACHE, Backend, transpyle_shared
+from compyle.numbers import Integer, Fraction
+from compyle.operators import OperatorBinary, BINARY_OPERATORS
+from compyle.variables import Reference
+from compyle.parser import unparse
+
+
+def test_fold_literals():
+    # ((1 + 2) * (3 / 4)) - 1:4
+    expression = OperatorBinary(
+        symbol="-",
+        children=(
+            OperatorBinary(
+                symbol="*",
+                children=(
+                    OperatorBinary(symbol="+", children=(Integer(1), Integer(2))),
+                    OperatorBinary(symbol="/", children=(Integer(3), Integer(4))),
+                ),
+            ),
+            Fraction(1, 4),
+        ),
+    )
+    lookups = CODE_CACHE.hits + CODE_CACHE.misses
+    assert expression.specialize({}) == Fraction(2, 1)
+    assert CODE_CACHE.hits + CODE_CACHE.misses == lookups
+
+
+def test_fold_division():
+    expression = OperatorBinary(symbol="/", children=(Integer(6), Integer(4)))
+    assert expression.specialize({}) == Fraction(3, 2)
+    assert expression.specialize({}).evaluate({}) == PyFraction(3, 2)
+
+
+def test_fold_partial():
+    literal = OperatorBinary(symbol="*", children=(Integer(2), Integer(3)))
+    expression = OperatorBinary(symbol="+", children=(Reference("a"), literal))
+    assert expression.specialize({}) == OperatorBinary(
+        symbol="+", children=(Reference("a"), Integer(6))
+    )
+
+
+def deep_expression(depth: int) -> OperatorBinary:
+    expression = Reference("x")
+    for level in range(depth):
+        expression = OperatorBinary(
+            symbol="+-*"[level % 3], children=(expression, Integer(level % 5 + 1))
+        )
+    return expression
+
+
+@pytest.mark.parametrize(
+    "backend", [Backend(), Backend(tree=True), Backend(vm_size=16)]
+)
+def test_deep_expressions(backend):
+    depth = 10 * sys.getrecursionlimit()
+    expression = deep_expression(depth)
+    assert expression.names.free == {"x"}
+    source = transpyle_shared(expression)
+    assert source.count("(") == source.count(")")
+    assert expression.transpyle(backend=backend) is expression.transpyle(
+        backend=backend
+    )
+    assert unparse(expression).count(" + ") == len(range(0, depth, 3))
+    # folding a deep expression collapses it to a single value
+    expected = 2
+    for level in range(depth):
+        expected = BINARY_OPERATORS["+-*"[level % 3]](expected, level % 5 + 1)
+    assert expression.specialize({"x": Integer(2)}) is Integer(expected)
+    transpylation = expression.transpyle(backend=backend)
+    assert transpylation.evaluate({"x": Integer(2)}) == expected
@@ -0,0 +1,73 @@
+from fractions import Fraction as PyFraction
+
+import pytest
+
+from compyle.interpret import eval, eval_incremental
+from compyle.numbers import PyRational
+from compyle.program import eval_compiled, compile_program
+from compyle.frontend import parse_source
+from compyle.interpret import Assign, Evaluate
+from compyle.numbers import Integer
+from compyle.transpyle import MAX_NESTING
+from compyle.variables import Reference
+
+from .test_examples import EXPRESSIONS
+from .test_operators import deep_expression
+
+
+PROGRAMS = [
+    [f">>> {expression}" for expression, _ in EXPRESSIONS],
+    ["a := 3", ">>> (a / 2:3) * (4 * 12)"],
+    ["a := 1", "b := 2", "c := 3", ">>> (a + b) * c", ">>> a + (b * c)"],
+    ["foo := 2 : 3", "bar := foo / 3", ">>> bar", "foo := 2", ">>> bar * 2"],
+    [">>> foo", "foo := bar", ">>> foo", "bar := 3", ">>> foo", ">>> (foo * baz)"],
+    ["lambda := 3", "yield := lambda * 2", ">>> yield"],
+    ["a := 1", ">>> (a + 2) / 4", "b := a * 3", ">>> (b / a) / b", "a := 1 : 2"]
+    + [">>> (a + b) / 2", ">>> a / (b - 2)"],
+    [],
+]
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_differential(source):
+    expected = list(eval(parse_source(source)))
+    assert list(eval_compiled(parse_source(source))) == expected
+
+
+INTEGER_DIVISIONS = (
+    ["a := 1", ">>> (a + 2) / 4", "b := a - 4", ">>> b / (a * 2)", ">>> (b * b) / a"],
+    [PyFraction(3, 4), PyFraction(-3, 2), 9],
+)
+
+
+@pytest.mark.parametrize("evaluator", [eval, eval_incremental, eval_compiled])
+def test_integer_division(evaluator):
+    source, expected = INTEGER_DIVISIONS
+    results = list(evaluator(parse_source(source)))
+    assert results == expected
+    assert all(type(result) is PyRational for result in results)
+
+
+def test_rerun():
+    program = compile_program(parse_source(["a := 3:4", ">>> a * 4"]))
+    assert list(program.run()) == list(program.run()) == [3]
+
+
+def test_deferred_error():
+    results = eval_compiled(parse_source([">>> 1", ">>> 1 / 0", ">>> 2"]))
+    assert next(results) == 1
+    with pytest.raises(ZeroDivisionError):
+        next(results)
+
+
+@pytest.mark.parametrize("depth", [MAX_NESTING - 1, MAX_NESTING, 300, 3000])
+def test_deep_expressions(depth):
+    expression = deep_expression(depth)
+    instructions = [
+        Assign("x", Integer(2)),
+        Evaluate(expression),
+        Assign("y", expression),
+        Evaluate(Reference("y")),
+    ]
+    expected = list(eval(instructions))
+    assert list(eval_compiled(instructions)) == expected
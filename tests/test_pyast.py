@@ -0,0 +1,51 @@
+import pytest
+
+from compyle.transpyle import BACKEND, CODE_CACHE
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+from compyle.numbers import Integer, Fraction
+from compyle.operators import OperatorBinary
+from compyle.variables import Reference
+from compyle.pyast import TreeTranspylation
+
+from .test_program import PROGRAMS
+
+
+@pytest.fixture
+def tree_backend():
+    BACKEND.tree, vm_size, BACKEND.vm_size = True, BACKEND.vm_size, 0
+    try:
+        yield
+    finally:
+        BACKEND.tree, BACKEND.vm_size = False, vm_size
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_tree_differential(source, tree_backend):
+    BACKEND.tree = False
+    expected = list(eval(parse_source(source)))
+    BACKEND.tree = True
+    assert list(eval(parse_source(source))) == expected
+
+
+def test_tree_source(tree_backend):
+    product = OperatorBinary(symbol="*", children=(Reference("a"), Fraction(1, 2)))
+    expression = OperatorBinary(
+        symbol="-",
+        children=(OperatorBinary(symbol="+", children=(product, product)), Integer(3)),
+    )
+    transpylation = expression.transpyle()
+    assert type(transpylation) is TreeTranspylation
+    # the shared product is computed only once
+    assert transpylation.source.count("*") == 1
+    assert transpylation.evaluate({"a": Integer(4)}) == 1
+    assert compile(transpylation.source, "<test>", "eval")
+
+
+def test_tree_cached(tree_backend, monkeypatch):
+    expression = OperatorBinary(symbol="+", children=(Reference("a"), Integer(12)))
+    assert expression.transpyle().evaluate({"a": Integer(2)}) == 14
+    misses = CODE_CACHE.misses
+    monkeypatch.setattr("compyle.pyast.transpyle_tree", pytest.fail)
+    assert expression.transpyle().evaluate({"a": Integer(3)}) == 15
+    assert CODE_CACHE.misses == misses
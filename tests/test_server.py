@@ -0,0 +1,59 @@
+import asyncio
+
+from compyle.interpret import Evaluate, Failure
+from compyle.namespace import Namespace
+from compyle.numbers import Integer
+from compyle.operators import OperatorBinary
+from compyle.server import start, parse_address, parse_request, evaluate_request
+
+
+def test_parse_address():
+    assert parse_address("8080") == ("127.0.0.1", 8080)
+    assert parse_address("localhost:8080") == ("localhost", 8080)
+    assert parse_address("/tmp/compyle.sock") == "/tmp/compyle.sock"
+
+
+async def session(port, lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("".join(line + "\n" for line in lines).encode())
+    writer.write_eof()
+    responses = (await reader.read()).decode().splitlines()
+    writer.close()
+    return responses
+
+
+async def sessions():
+    server = await start(("127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await asyncio.gather(
+            session(port, ["a := 3", ">>> a * 2", ">>> b"]),
+            session(port, ["b := 1:2", ">>> b * 2", ">>> a", ">>> 3 +", ">>> 1 / 0"]),
+        )
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_sessions():
+    loop = asyncio.new_event_loop()
+    try:
+        first, second = loop.run_until_complete(sessions())
+    finally:
+        loop.close()
+    assert first == ["6", "NameError: name 'b' is not defined"]
+    assert second[:2] == ["1", "NameError: name 'a' is not defined"]
+    assert second[2].startswith("SyntaxError: ")
+    assert second[3].startswith("ZeroDivisionError: ")
+
+
+def test_requests():
+    assert type(parse_request(">>> 3 +")) is Failure
+    namespace = Namespace().set("a", Integer(3))
+    assert evaluate_request(parse_request(">>> a * 2"), namespace) == 6
+    for line in (">>> b", ">>> 1 / 0"):
+        assert type(evaluate_request(parse_request(line), namespace)) is Failure
+    # compilation errors are not regular exceptions, but must be reported as well
+    unknown = OperatorBinary(symbol="%", children=(Integer(1), Integer(2)))
+    result = evaluate_request(Evaluate(unknown), namespace)
+    assert type(result) is Failure and result.startswith("CompylationError: ")
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import sys
+from fractions import Fraction as PyFraction
+
+import pytest
+
+from compyle.interpret import eval, eval_parallel, Failure
+from compyle.program import eval_compiled
+from compyle.frontend import parse_source, run_instructions
+from compyle.sinks import TextSink, JsonLinesSink, CsvSink, BinarySink, read_binary
+
+SOURCE = ["a := 3", ">>> a / 4", "b := a * 2", ">>> b", ">>> c", ">>> 1:2 * 2"]
+#: statement index and result of every evaluation in SOURCE
+EXPECTED = [
+    (1, PyFraction(3, 4)),
+    (3, 6),
+    (4, "NameError: name 'c' is not defined"),
+    (5, 1),
+]
+
+
+def run_sink(sink_type, evaluator=eval, **kwargs):
+    stream = io.BytesIO() if sink_type.binary else io.StringIO()
+    run_instructions(parse_source(SOURCE), evaluator, sink_type(stream, **kwargs))
+    return stream.getvalue()
+
+
+def test_failure():
+    (failure,) = eval(parse_source([">>> c"]))
+    assert type(failure) is Failure
+    assert str(failure) == "NameError: name 'c' is not defined"
+    assert list(eval_compiled(parse_source([">>> c"]))) == [failure]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 8192])
+def test_text(batch_size, capsys):
+    run_instructions(parse_source(SOURCE))
+    printed = capsys.readouterr().out
+    assert run_sink(TextSink, batch_size=batch_size) == printed
+
+
+@pytest.mark.parametrize("evaluator", [eval, eval_compiled, eval_parallel])
+def test_jsonl(evaluator):
+    records = [
+        json.loads(line) for line in run_sink(JsonLinesSink, evaluator).split("\n")[:-1]
+    ]
+    assert [record["index"] for record in records] == [index for index, _ in EXPECTED]
+    assert records[0] == {
+        "index": 1,
+        "type": "rational",
+        "numerator": 3,
+        "denominator": 4,
+    }
+    assert records[1] == {
+        "index": 3,
+        "type": "integer",
+        "numerator": 6,
+        "denominator": 1,
+    }
+    assert records[2]["type"] == "error" and records[2]["message"] == EXPECTED[2][1]
+    assert records[3]["type"] == "rational"
+
+
+def test_parse_error_diagnostic(capsys):
+    source = ["a := 3", ">>> a * 2", ">>> a +* 2", ">>> a"]
+    with pytest.raises(SystemExit):
+        run_instructions(parse_source(source), eval, JsonLinesSink(sys.stdout))
+    captured = capsys.readouterr()
+    # diagnostics must not corrupt the structured results
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert records == [
+        {"index": 1, "type": "integer", "numerator": 6, "denominator": 1}
+    ]
+    assert "a +* 2" in captured.err
+
+
+def test_csv():
+    rows = list(csv.DictReader(io.StringIO(run_sink(CsvSink, batch_size=2))))
+    assert [int(row["index"]) for row in rows] == [index for index, _ in EXPECTED]
+    assert rows[0]["type"] == "rational"
+    assert (rows[0]["numerator"], rows[0]["denominator"]) == ("3", "4")
+    assert rows[2]["type"] == "error" and rows[2]["message"] == EXPECTED[2][1]
+    assert run_sink(CsvSink, evaluator=lambda _: iter(())).startswith("index,type")
+
+
+def test_binary():
+    records = list(read_binary(io.BytesIO(run_sink(BinarySink))))
+    assert records == EXPECTED
+    assert type(records[2][1]) is Failure
+    stream = io.BytesIO()
+    with BinarySink(stream) as sink:
+        sink.write(0, -(2**100))
+        sink.write(1, PyFraction(-1, 2**70))
+    assert list(read_binary(io.BytesIO(stream.getvalue()))) == [
+        (0, -(2**100)),
+        (1, PyFraction(-1, 2**70)),
+    ]
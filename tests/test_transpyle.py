@@ -0,0 +1,167 @@
+import copy
+import pickle
+
+import pytest
+
+from compyle.transpyle import (
+    Backend,
+    CodeCache,
+    CODE_CACHE,
+    ValueType,
+    infer_types,
+    reference_types,
+    shared_subexpressions,
+)
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+from compyle.numbers import Integer, Fraction
+from compyle.operators import OperatorBinary
+from compyle.variables import Reference
+
+#: transpyle to source code even for small expressions
+SOURCE = Backend(vm_size=0)
+
+
+def test_code_cache_reuse():
+    cache = CodeCache(maxsize=2)
+    code = cache.compile("1 + 2")
+    assert cache.compile("1 + 2") is code
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_code_cache_bounded():
+    cache = CodeCache(maxsize=2)
+    first = cache.compile("1")
+    cache.compile("2")
+    cache.compile("1")
+    cache.compile("3")
+    assert len(cache) == 2
+    assert cache.compile("1") is first
+    assert cache.misses == 3
+    cache.compile("2")
+    assert cache.misses == 4
+    cache.maxsize = 1
+    assert len(cache) == 1
+    with pytest.raises(ValueError):
+        cache.maxsize = -1
+
+
+def test_code_cache_disabled():
+    cache = CodeCache(maxsize=0)
+    cache.compile("1")
+    cache.compile("1")
+    assert (len(cache), cache.misses) == (0, 2)
+
+
+def test_evaluate_compiles_once():
+    source = ["a := 3", "b := (a * 2)"] + [">>> (b / a)"] * 10
+    list(eval(parse_source(source)))
+    misses = CODE_CACHE.misses
+    results = list(eval(parse_source(source)))
+    assert results == [2] * 10
+    assert CODE_CACHE.misses == misses
+
+
+def test_interning():
+    first = OperatorBinary(symbol="+", children=[Reference("a"), Integer(3)])
+    second = OperatorBinary(symbol="+", children=(Reference("a"), Integer(3)))
+    assert first is second
+    assert first is not OperatorBinary(symbol="-", children=first.children)
+    assert Fraction(1, 2) is Fraction(numerator=1, denominator=2)
+    assert pickle.loads(pickle.dumps(first)) is first
+    assert copy.deepcopy(first) is first
+    assert not hasattr(first, "__dict__")
+    reference = Reference("a")
+    assert reference.names is Reference("a").names
+
+
+def test_common_subexpressions():
+    product = OperatorBinary(symbol="*", children=(Reference("a"), Reference("b")))
+    expression = OperatorBinary(symbol="+", children=(product, product))
+    source = expression.transpyle(backend=SOURCE).source
+    assert source.count("*") == 1
+    assert source.count("['a']") == source.count("['b']") == 1
+    # literals are not worth sharing, even if they are needed several times
+    expression = OperatorBinary(
+        symbol="+",
+        children=(
+            OperatorBinary(symbol="*", children=(Integer(2), Reference("a"))),
+            OperatorBinary(symbol="*", children=(Integer(2), Reference("b"))),
+        ),
+    )
+    assert shared_subexpressions(expression) == set()
+    assert "__cse" not in expression.transpyle(backend=SOURCE).source
+    source = ["a := 3", "b := 1:2", ">>> ((a * b) + (a * b)) * (a - (a * b))"]
+    assert list(eval(parse_source(source))) == [Fraction(9, 2).evaluate({})]
+
+
+class CountingMapping(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+@pytest.mark.parametrize(
+    "backend", [SOURCE, Backend(tree=True), Backend(vm_size=16)], ids=str
+)
+def test_shared_references(backend):
+    a, b = Reference("a"), Reference("b")
+    expression = OperatorBinary(
+        symbol="+",
+        children=(
+            OperatorBinary(symbol="*", children=(a, b)),
+            OperatorBinary(symbol="-", children=(a, b)),
+        ),
+    )
+    assert shared_subexpressions(expression) == {a, b}
+    namespace = CountingMapping(a=Integer(3), b=Integer(2))
+    assert expression.transpyle(backend=backend).evaluate(namespace) == 7
+    # each name is looked up only once
+    assert namespace.lookups == 2
+
+
+class NoIterMapping(dict):
+    def __iter__(self):
+        raise AssertionError("namespace must not be iterated")
+
+    def keys(self):
+        raise AssertionError("namespace must not be iterated")
+
+
+def test_flat_names():
+    expression = Reference("x")
+    for level in range(100):
+        expression = OperatorBinary(
+            symbol="+", children=(expression, Fraction(1, 2) if level else Integer(1))
+        )
+    names = expression.names
+    assert type(names.free) is frozenset and names.free == {"x"}
+    assert dict(names.bound) == {**Integer.names.bound, **Fraction.names.bound}
+    # nested expressions share the names of their widest child
+    assert expression.children[0].names is names
+    namespace = NoIterMapping(x=Integer(2))
+    assert expression.transpyle().evaluate(namespace) == 3 + 99 * Fraction(
+        1, 2
+    ).evaluate({})
+
+
+def test_value_types():
+    a, b = Reference("a"), Reference("b")
+    total = OperatorBinary(symbol="+", children=(a, Integer(2)))
+    ratio = OperatorBinary(symbol="/", children=(total, b))
+    types = infer_types(ratio, {"a": ValueType.INTEGER})
+    assert types[total] is ValueType.INTEGER
+    assert types[b] is ValueType.ANY
+    assert types[ratio] is ValueType.RATIONAL
+    # integers are inlined and only divided via a helper if needed
+    assert ratio.transpyle(backend=SOURCE).source.startswith("__divide__((")
+    assert "2" in total.transpyle(backend=SOURCE).source
+    namespace = {"a": Integer(1), "b": OperatorBinary(symbol="*", children=(a, a))}
+    types = reference_types(ratio, namespace)
+    assert types["a"] is types["b"] is ValueType.INTEGER
+    assert ratio.transpyle(types, SOURCE).source.startswith("__PyRational__((")
+    assert reference_types(a, {"a": a}) == {"a": ValueType.ANY}
@@ -0,0 +1,97 @@
+from fractions import Fraction as PyFraction
+import random
+
+import pytest
+
+from compyle.fastparse import parse_line
+from compyle.interpret import CyclicReference
+from compyle.namespace import Namespace
+
+np = pytest.importorskip("numpy")
+
+from compyle.vectorize import evaluate_vectorized, as_column  # noqa: E402
+
+from .test_fastparse import random_expression  # noqa: E402
+
+
+def scalar_values(expression, bindings):
+    size = len(next(iter(bindings.values())))
+    results = []
+    for index in range(size):
+        namespace = Namespace(
+            (name, parse_line(f"x := {values[index]}").expression)
+            for name, values in bindings.items()
+        )
+        results.append(expression.evaluate(namespace))
+    return results
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_differential(seed):
+    rng = random.Random(seed)
+    expression = random_expression(rng, 4)
+    bindings = {
+        "a": np.array([rng.randint(-50, 50) for _ in range(16)]),
+        "foo": np.array([rng.randint(1, 50) for _ in range(16)]),
+        "Bar_baz": [
+            PyFraction(rng.randint(-50, 50), rng.randint(1, 50)) for _ in range(16)
+        ],
+    }
+    bindings_source = {
+        name: [
+            f"{PyFraction(value).numerator}:{PyFraction(value).denominator}"
+            for value in values
+        ]
+        for name, values in bindings.items()
+    }
+    try:
+        expected = scalar_values(expression, bindings_source)
+    except ZeroDivisionError:
+        with pytest.raises(ZeroDivisionError):
+            evaluate_vectorized(expression, bindings)
+    else:
+        assert evaluate_vectorized(expression, bindings).values() == expected
+
+
+def test_overflow():
+    big = np.array([2**62, -(2**62), 3], dtype=np.int64)
+    expression = parse_line(">>> ((a * a) + (a / 3))").expression
+    result = evaluate_vectorized(expression, {"a": big})
+    assert result.numerator.dtype == object
+    assert result.values() == [
+        value * value + PyFraction(value, 3) for value in big.tolist()
+    ]
+
+
+def test_namespace():
+    namespace = Namespace({"b": parse_line("x := a * 2").expression})
+    expression = parse_line(">>> b + 1:2").expression
+    result = evaluate_vectorized(expression, {"a": np.arange(3)}, namespace)
+    assert result.values() == [PyFraction(1, 2), PyFraction(5, 2), PyFraction(9, 2)]
+    with pytest.raises(KeyError):
+        evaluate_vectorized(parse_line(">>> c").expression, {}, namespace)
+
+
+def test_broadcast():
+    expression = parse_line(">>> 3").expression
+    assert evaluate_vectorized(expression, {"a": np.arange(4)}).values() == [3] * 4
+    assert as_column([1, 2]).is_integer
+    assert not as_column([PyFraction(1, 2), 2]).is_integer
+
+
+def test_cyclic_namespace():
+    namespace = Namespace(
+        {
+            "b": parse_line("x := (c + a)").expression,
+            "c": parse_line("x := (b * 2)").expression,
+        }
+    )
+    with pytest.raises(CyclicReference):
+        evaluate_vectorized(parse_line(">>> b").expression, {"a": [1]}, namespace)
+
+
+def test_many_bindings():
+    bindings = {"a" * length: np.arange(3) for length in range(1, 41)}
+    bindings["b"] = np.arange(2).reshape(2, 1)
+    expression = parse_line(">>> (a + b)").expression
+    assert evaluate_vectorized(expression, bindings).shape == (2, 3)
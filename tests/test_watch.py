@@ -0,0 +1,56 @@
+import io
+
+from compyle.interpret import eval
+from compyle.frontend import parse_source
+from compyle.watch import WatchedProgram, FileWatcher
+
+from .test_program import PROGRAMS
+
+
+def test_watched_differential():
+    program = WatchedProgram()
+    for source in PROGRAMS:
+        program.update(source)
+        assert program.results() == list(eval(parse_source(source)))
+
+
+def test_rerun_from_change(monkeypatch):
+    program = WatchedProgram()
+    assert program.update(["a := 3", "b := (a * 2)", ">>> b", "", ">>> a"]) == 0
+    assert program.results() == [6, 3]
+    parsed = []
+    monkeypatch.setattr(
+        "compyle.watch.parse_statement",
+        lambda line: parsed.append(line) or parse_source([line]).__next__(),
+    )
+    assert program.update(["a := 3", "b := (a * 5)", ">>> b", "", ">>> a"]) == 1
+    assert program.results() == [15, 3]
+    assert parsed == ["b := (a * 5)"]
+    assert program.update(["a := 3", "b := (a * 5)", ">>> b", "", ">>> a  "]) == 5
+    assert program.update(["a := 3", "b := (a * 5)", ">>> b"]) == 3
+    assert program.results() == [15]
+    assert program.update(["a := 3", "b := (a * 5)", ">>> b", ">>> c"]) == 3
+    assert program.results(3) == ["NameError: name 'c' is not defined"]
+    assert parsed == ["b := (a * 5)", ">>> c"]
+
+
+def test_errors():
+    program = WatchedProgram()
+    program.update(["a := (1 / 0)", "b := 3 +", ">>> b", ">>> 1"])
+    first, second, third, fourth = program.results()
+    assert first.startswith("ZeroDivisionError")
+    assert second.startswith("SyntaxError")
+    assert third == "NameError: name 'b' is not defined"
+    assert fourth == 1
+
+
+def test_watch_file(tmp_path):
+    path = tmp_path / "program.toy"
+    path.write_text("a := 3\n>>> a\n")
+    output = io.StringIO()
+    watcher = FileWatcher(str(path), output)
+    assert watcher.check()
+    assert not watcher.check()
+    path.write_text("a := 3\n>>> a\n>>> a * 2\n")
+    assert watcher.check()
+    assert output.getvalue() == f"3\n# {path}: re-run from line 3\n6\n"